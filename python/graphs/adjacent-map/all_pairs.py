@@ -0,0 +1,52 @@
+import numpy as np
+from graph import Graph
+
+
+def floyd_warshall_weighted(G: Graph, dtype=np.float64, predecessors=True):
+    """Returns (distance, predecessor) matrices for all pairs of vertices
+
+    Rows and columns follow Vertex.index(). distance[i][j] is inf if j is not
+    reachable from i. predecessor[i][j] is the index of the vertex before j
+    on a shortest path from i, -1 if there is none; it is None when
+    predecessors=False, which roughly halves the running time.
+    Each of the n rounds updates the whole matrix with NumPy broadcasting
+    into preallocated buffers, dtype=np.float32 halves the memory.
+    Raises ValueError on negative cycles
+    """
+    n = G.vertex_count()
+    distance = np.array(G.to_matrix(), dtype=dtype).reshape(n, n)
+    np.fill_diagonal(distance, np.minimum(distance.diagonal(), 0))
+
+    if not predecessors:
+        predecessor = None
+        through = np.empty_like(distance)
+        for k in range(n):
+            np.add(distance[:, k, None], distance[k], out=through)
+            np.minimum(distance, through, out=distance)
+    else:
+        predecessor = np.where(np.isinf(distance), -1, np.arange(n)[:, None])
+        np.fill_diagonal(predecessor, np.where(distance.diagonal() < 0, np.arange(n), -1))
+        through = np.empty_like(distance)
+        better = np.empty((n, n), dtype=bool)
+        for k in range(n):
+            np.add(distance[:, k, None], distance[k], out=through)
+            np.less(through, distance, out=better)
+            np.copyto(distance, through, where=better)
+            np.copyto(predecessor, predecessor[k], where=better)
+
+    if (distance.diagonal() < 0).any():
+        raise ValueError("the graph has a negative cycle")
+    return distance, predecessor
+
+
+def matrix_path(G: Graph, predecessor, u: Graph.Vertex, v: Graph.Vertex):
+    """Returns the vertices of the shortest path from u to v, [] if there is none"""
+    i, j = u.index(), v.index()
+    if i != j and predecessor[i, j] < 0:
+        return []
+    path = [j]
+    while j != i:
+        j = int(predecessor[i, j])
+        path.append(j)
+    path.reverse()
+    return [G.vertex(k) for k in path]
@@ -0,0 +1,244 @@
+"""Benchmark harness for the graph algorithms
+
+Run python benchmarks.py to sweep graph sizes and densities across the
+generator families, print wall time, edges per second, peak traced memory
+and the memory blocks each algorithm allocates for its result and
+internal state, and optionally write them as JSON.
+Passing an earlier JSON file as --baseline exits with status 1 when any
+case got slower than --threshold allows
+"""
+
+import argparse
+import gc
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from graph import Graph
+import bfs
+import dfs
+import generators
+from dijkstra import dijkstra
+from priority_queue import IndexedHeap, BucketQueue
+from topological_sorting import topological_sorting
+
+# family -> builder of a graph with about n vertices and density * n edges
+FAMILIES = {
+    "erdos_renyi": lambda n, density, seed: generators.erdos_renyi(
+        n, min(density * n, n * (n - 1) // 2), True, seed=seed
+    ),
+    "rmat": lambda n, density, seed: generators.rmat(
+        max(1, n.bit_length() - 1), density, seed=seed
+    ),
+    "grid": lambda n, density, seed: generators.grid(
+        math.isqrt(n), math.isqrt(n), diagonals=density > 2, seed=seed
+    ),
+    "dag": lambda n, density, seed: generators.random_dag(
+        n, min(density * n, n * (n - 1) // 2), seed=seed
+    ),
+}
+
+# algorithm -> (function of the graph and a source, families it runs on, largest n)
+# larger sizes run at the largest n instead, all-pairs algorithms are cubic
+ALGORITHMS = {
+    "dijkstra": (dijkstra, FAMILIES, None),
+    "bfs_queue": (bfs.bfs_queue, FAMILIES, None),
+    "dfs_stack": (dfs.dfs_stack, FAMILIES, None),
+    "topological_sorting": (lambda G, s: topological_sorting(G), ("dag",), None),
+    "floyd_warshall": (lambda G, s: bfs.floyd_warshall(G), FAMILIES, 250),
+}
+
+
+def measure(func, G: Graph, s: Graph.Vertex, repeat=3):
+    """Returns the best wall time of repeat runs of func(G, s), the peak traced
+    memory of one more run and the number of memory blocks that run allocated
+    and still holds when it returns, its result included
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(G, s)
+        best = min(best, time.perf_counter() - start)
+
+    # traced separately, tracemalloc slows the run down
+    gc.collect()
+    tracemalloc.start()
+    # the snapshots are allocated by tracemalloc itself, leave them out
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    before = tracemalloc.take_snapshot().filter_traces(ignore)
+    tracemalloc.reset_peak()
+    current = tracemalloc.get_traced_memory()[0]
+    result = func(G, s)
+    peak = tracemalloc.get_traced_memory()[1] - current
+    after = tracemalloc.take_snapshot().filter_traces(ignore)
+    tracemalloc.stop()
+    del result
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    return best, peak, blocks
+
+
+def run(sizes=(1000, 4000), densities=(2, 8), repeat=3, seed=0, algorithms=None):
+    """Runs every algorithm on every family, size and density, returns the
+    results keyed by "algorithm/family/n=size/d=density"
+    """
+    cases = {}
+    # (graph, source) by family, size and density, the source is the
+    # vertex of largest degree so searches reach a large part of the graph
+    graphs = {}
+    for name, (func, families, max_n) in ALGORITHMS.items():
+        if algorithms is not None and name not in algorithms:
+            continue
+        capped = sizes if max_n is None else sorted({min(n, max_n) for n in sizes})
+        for family in families:
+            for n in capped:
+                for density in densities:
+                    key = (family, n, density)
+                    if key not in graphs:
+                        G = FAMILIES[family](n, density, seed)
+                        graphs[key] = G, max(G.vertices(), key=G.degree)
+                    G, s = graphs[key]
+                    seconds, peak, blocks = measure(func, G, s, repeat)
+                    cases[f"{name}/{family}/n={n}/d={density}"] = {
+                        "vertices": G.vertex_count(),
+                        "edges": G.edge_count(),
+                        "seconds": seconds,
+                        "edges_per_second": G.edge_count() / seconds if seconds else None,
+                        "peak_bytes": peak,
+                        "allocated_blocks": blocks,
+                    }
+    return cases
+
+
+def regressions(cases: dict, baseline: dict, threshold=0.25):
+    """Returns (case, old seconds, new seconds) for the cases more than
+    threshold slower than in the baseline
+    """
+    slower = []
+    for name, result in cases.items():
+        old = baseline.get(name)
+        if old is not None and result["seconds"] > old["seconds"] * (1 + threshold):
+            slower.append((name, old["seconds"], result["seconds"]))
+    return slower
+
+
+def bench_queues(sizes=((2000, 8000), (2000, 200000)), weights=(10, 10000), repeat=3):
+    """Times dijkstra with each priority queue on sparse and dense random graphs
+
+    heapq runs in C, so it stays fastest on sparse graphs despite the
+    duplicate entries. The indexed heaps bound the queue to n items, which
+    matters for memory on dense graphs, and 4-ary heaps need fewer sift
+    levels than binary ones. BucketQueue wins when weights are small
+    integers, its cost grows with the largest weight
+    """
+    rows = []
+    for n, m in sizes:
+        for max_weight in weights:
+            G = generators.erdos_renyi(n, m, True, max_weight, seed=0)
+            s = G.vertex(0)
+            queues = {
+                "heapq": lambda: None,
+                "binary": lambda: IndexedHeap(G.vertex_count()),
+                "4-ary": lambda: IndexedHeap(G.vertex_count(), 4),
+                "dial": lambda: BucketQueue(G.vertex_count(), max_weight),
+            }
+            for name, make in queues.items():
+                best = float("inf")
+                for _ in range(repeat):
+                    queue = make()
+                    start = time.perf_counter()
+                    dijkstra(G, s, indexed=True, queue=queue)
+                    best = min(best, time.perf_counter() - start)
+                rows.append((n, G.edge_count(), max_weight, name, best))
+    return rows
+
+
+def bench_topological_order(sizes=((500, 1500), (2000, 6000)), seed=0):
+    """Times keeping a topological order while edges of a random DAG arrive one
+    at a time, incrementally against recomputing topological_sorting each time
+    """
+    rows = []
+    for n, m in sizes:
+        rng = random.Random(seed)
+        edges = []
+        while len(edges) < m:
+            a, b = rng.randrange(n), rng.randrange(n)
+            if a != b:
+                edges.append((min(a, b), max(a, b)))
+        # insert the vertices in random order, so the initial order disagrees
+        insertion = list(range(n))
+        rng.shuffle(insertion)
+
+        timings = {}
+        for name in ("incremental", "recompute"):
+            G = Graph(True)
+            vertices = [None] * n
+            for i in insertion:
+                vertices[i] = G.insert_vertex(i)
+            if name == "incremental":
+                order = G.track_topological_order()
+            start = time.perf_counter()
+            for a, b in edges:
+                G.insert_edge(vertices[a], vertices[b])
+                if name == "incremental":
+                    order.position(vertices[b])
+                else:
+                    topological_sorting(G)
+            timings[name] = time.perf_counter() - start
+        rows.append((n, m, timings["incremental"], timings["recompute"]))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 4000])
+    parser.add_argument("--densities", type=int, nargs="+", default=[2, 8])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--algorithms", nargs="+", choices=list(ALGORITHMS))
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--queues", action="store_true", help="also compare dijkstra queues")
+    parser.add_argument(
+        "--topological", action="store_true", help="also time incremental topological orders"
+    )
+    args = parser.parse_args(argv)
+
+    cases = run(args.sizes, args.densities, args.repeat, args.seed, args.algorithms)
+    print(f"{'case':<44} {'seconds':>9} {'edges/s':>11} {'peak KiB':>9} {'blocks':>8}")
+    for name, result in cases.items():
+        print(
+            f"{name:<44} {result['seconds']:>9.4f} {result['edges_per_second'] or 0:>11.0f}"
+            f" {result['peak_bytes'] / 1024:>9.0f} {result['allocated_blocks']:>8}"
+        )
+
+    if args.queues:
+        print(f"{'n':>8} {'m':>8} {'max w':>8} {'queue':>8} {'seconds':>10}")
+        for n, m, max_weight, name, seconds in bench_queues():
+            print(f"{n:>8} {m:>8} {max_weight:>8} {name:>8} {seconds:>10.4f}")
+
+    if args.topological:
+        print(f"{'n':>8} {'m':>8} {'incremental':>12} {'recompute':>10}")
+        for n, m, incremental, recompute in bench_topological_order():
+            print(f"{n:>8} {m:>8} {incremental:>12.4f} {recompute:>10.4f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"python": platform.python_version(), "cases": cases}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["cases"]
+        slower = regressions(cases, baseline, args.threshold)
+        for name, old, new in slower:
+            print(f"regression {name}: {old:.4f}s -> {new:.4f}s")
+        if slower:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
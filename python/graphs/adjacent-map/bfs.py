@@ -1,6 +1,9 @@
 from graph import Graph
+from query_cache import cached
+from compact_graph import CompactGraph
+from transitive_closure import TransitiveClosure
+from instrumentation import TraversalStats
 from collections import deque
-from copy import deepcopy
 
 
 def bfs(G: Graph, s: Graph.Vertex, discovered: dict[Graph.Vertex, Graph.Edge]):
@@ -17,31 +20,208 @@ def bfs(G: Graph, s: Graph.Vertex, discovered: dict[Graph.Vertex, Graph.Edge]):
         level = next_level
 
 
-def bfs_queue(G: Graph, s: Graph.Vertex):
+def bfs_iter(
+    G: Graph,
+    s: Graph.Vertex,
+    max_depth=None,
+    max_vertices=None,
+    until=None,
+    outgoing=True,
+):
+    """Yields (vertex, edge used to discover it, depth) in BFS order, starting at (s, None, 0)
+
+    Vertices are discovered only as they are consumed, so the work is
+    proportional to what is yielded. Vertices deeper than max_depth are
+    not visited, at most max_vertices are yielded and the search stops
+    after yielding the first vertex v with until(v) true.
+    Outgoing parameter can be used to act over incoming edges
+    """
+    adj = G._outgoing if outgoing else G._incoming
+    seen = {s}
+    queue = deque([(s, 0)])
+    count = 1
+
+    yield s, None, 0
+    if (max_vertices is not None and count >= max_vertices) or (
+        until is not None and until(s)
+    ):
+        return
+
+    while queue:
+        v, depth = queue.popleft()
+        if max_depth is not None and depth >= max_depth:
+            continue
+        for u, e in adj[v].items():
+            if u not in seen:
+                seen.add(u)
+                yield u, e, depth + 1
+                count += 1
+                if max_vertices is not None and count >= max_vertices:
+                    return
+                if until is not None and until(u):
+                    return
+                queue.append((u, depth + 1))
+
+
+def bfs_direction_optimizing(
+    G: Graph,
+    s: Graph.Vertex,
+    discovered: dict[Graph.Vertex, Graph.Edge],
+    alpha=14,
+    beta=24,
+    *,
+    stats: TraversalStats = None,
+):
+    """Assumes argument discovered[s] = None was added
+
+    Level synchronous BFS that switches to bottom-up steps while the
+    frontier is large: every undiscovered vertex then looks for a parent
+    among its incoming neighbours in a frontier bitmap and stops at the
+    first one. It goes bottom-up once the edges leaving the frontier exceed
+    1/alpha of the edges leaving undiscovered vertices, and back top-down
+    once the frontier holds less than 1/beta of the vertices.
+    Returns the list of levels, the distance to s is the level index
+    A TraversalStats given as stats gets the edges scanned and the time
+    spent in top_down and bottom_up steps
+    """
+    if stats is not None:
+        stats.start()
+    outgoing = G._outgoing
+    incoming = G._incoming
+    vertices = G._vertex_list
+    n = len(vertices)
+    seen = bytearray(n)
+    for v in discovered:
+        seen[v._index] = 1
+    level = [s]
+    levels = []
+    unexplored = sum(len(outgoing[v]) for v in vertices if not seen[v._index])
+    bottom_up = False
+
+    while level:
+        levels.append(level)
+        frontier_edges = sum(len(outgoing[u]) for u in level)
+        if not bottom_up and frontier_edges > unexplored / alpha:
+            bottom_up = True
+        elif bottom_up and len(level) < n / beta:
+            bottom_up = False
+
+        next_level = []
+        if bottom_up:
+            frontier = bytearray(n)
+            for u in level:
+                frontier[u._index] = 1
+            scanned = 0
+            for v in vertices:
+                if seen[v._index]:
+                    continue
+                for u, e in incoming[v].items():
+                    scanned += 1
+                    if frontier[u._index]:
+                        seen[v._index] = 1
+                        discovered[v] = e
+                        next_level.append(v)
+                        break
+            if stats is not None:
+                stats.edges_scanned += scanned
+        else:
+            for u in level:
+                for v, e in outgoing[u].items():
+                    if not seen[v._index]:
+                        seen[v._index] = 1
+                        discovered[v] = e
+                        next_level.append(v)
+            if stats is not None:
+                stats.edges_scanned += frontier_edges
+        if stats is not None:
+            stats.vertices_settled += len(level)
+            stats.frontier(len(level))
+            stats.lap("bottom_up" if bottom_up else "top_down")
+        for v in next_level:
+            unexplored -= len(outgoing[v])
+        level = next_level
+    return levels
+
+
+@cached
+def bfs_queue(G: Graph, s: Graph.Vertex, indexed=False, *, stats: TraversalStats = None):
+    """Returns a map with the Vertex as key and the Edge used to discover it as value
+
+    With indexed=True returns instead a list indexed by Vertex.index() holding
+    the discovery edges, None for s and for the undiscovered vertices
+    A TraversalStats given as stats gets the counters and the search and
+    result phase timings
+    """
+    if stats is not None:
+        stats.start()
+    parent, order = _bfs_indexed(G, s, stats)
+    if stats is not None:
+        stats.lap("search")
+    if indexed:
+        return parent
     discovered = {s: None}
+    for u in order[1:]:
+        discovered[u] = parent[u._index]
+    if stats is not None:
+        stats.lap("result")
+    return discovered
+
+
+def _bfs_indexed(G: Graph, s: Graph.Vertex, stats: TraversalStats = None):
+    """Queue based BFS keeping the per vertex state in lists indexed by vertex
+
+    Returns the list of discovery edges and the vertices in discovery order
+    """
+    adj = G._outgoing
+    parent: list[Graph.Edge] = [None] * G.vertex_count()
+    seen = bytearray(G.vertex_count())
+    seen[s._index] = 1
     queue = deque()
     queue.append(s)
+    order = [s]
 
     while queue:
+        if stats is not None:
+            stats.frontier(len(queue))
         v = queue.popleft()
-        for e in G.incident_edges(v):
-            u = e.opposite(v)
-            if u not in discovered:
-                discovered[u] = e
+        if stats is not None:
+            stats.vertices_settled += 1
+            stats.edges_scanned += len(adj[v])
+        for u, e in adj[v].items():
+            i = u._index
+            if not seen[i]:
+                seen[i] = 1
+                parent[i] = e
                 queue.append(u)
+                order.append(u)
+    return parent, order
+
+
+def bfs_queue_compact(C: CompactGraph, s: Graph.Vertex):
+    """Same as bfs_queue, but runs over the integer arrays of a CompactGraph"""
+    offsets, targets = C.csr()
+    parent = [-1] * C.vertex_count()
+    src = C.index(s)
+    order = [src]
+    parent[src] = src
+
+    for v in order:
+        for pos in range(offsets[v], offsets[v + 1]):
+            u = targets[pos]
+            if parent[u] == -1:
+                parent[u] = pos
+                order.append(u)
+
+    discovered = {s: None}
+    for u in order[1:]:
+        discovered[C.vertex(u)] = C.edge(parent[u])
     return discovered
 
 
 def floyd_warshall(G: Graph):
-    closure = deepcopy(G)
-    vers = list(closure.vertices())
-    n = len(vers)
-
-    for k in range(n):
-        for i in range(n):
-            if i != k and closure.get_edge(vers[i], vers[k]) is not None:
-                for j in range(n):
-                    if i != j != k and closure.get_edge(vers[k], vers[j]) is not None:
-                        if closure.get_edge(vers[i], vers[j]) is None:
-                            closure.insert_edge(vers[i], vers[j])
-    return closure
+    """Returns a new graph with an edge (u, v) wherever v is reachable from u
+
+    Built from a TransitiveClosure instead of the O(n^3) Floyd-Warshall loop,
+    use TransitiveClosure directly to query reachability without a graph
+    """
+    return TransitiveClosure(G).to_graph()
@@ -0,0 +1,353 @@
+from __future__ import annotations
+from array import array
+from bisect import bisect_right
+import json
+import mmap
+import struct
+import sys
+from graph import Graph
+
+# magic, version, flags, vertices, slots, edges, label table bytes
+_HEADER = struct.Struct("<4sIIQQQQ")
+_MAGIC = b"CSRG"
+_VERSION = 1
+_DIRECTED = 1
+_BIG_ENDIAN = 2
+_INT_WEIGHTS = 4
+_FLOAT_WEIGHTS = 8
+
+
+def _edge_weights(edges: list[Graph.Edge]):
+    """Returns an array with the elements of the edges, None if any is not a number"""
+    return _number_array([e.element() for e in edges])
+
+
+def _number_array(elements):
+    """Returns an integer or float array of elements, None if any is not a number"""
+    for typecode in ("q", "d"):
+        try:
+            return array(typecode, elements)
+        except (TypeError, OverflowError):
+            pass
+    return None
+
+
+def _incoming_csr(offsets, targets):
+    """Returns the (in_offsets, in_targets, in_edge_ids) arrays of an outgoing CSR"""
+    # counting sort of the outgoing slots by their target
+    n = len(offsets) - 1
+    in_offsets = array("q", [0]) * (n + 1)
+    for t in targets:
+        in_offsets[t + 1] += 1
+    for i in range(n):
+        in_offsets[i + 1] += in_offsets[i]
+
+    fill = in_offsets[:-1]
+    in_targets = array("q", [0]) * len(targets)
+    in_edge_ids = array("q", [0]) * len(targets)
+    for u in range(n):
+        for pos in range(offsets[u], offsets[u + 1]):
+            t = targets[pos]
+            slot = fill[t]
+            in_targets[slot] = u
+            in_edge_ids[slot] = pos
+            fill[t] = slot + 1
+    return in_offsets, in_targets, in_edge_ids
+
+
+class CompactGraph:
+    """Immutable compressed sparse row (CSR) snapshot of a Graph
+
+    Vertices are renumbered 0..n-1 and the outgoing neighbours of vertex i
+    are targets[offsets[i]:offsets[i + 1]]. The position of a neighbour in
+    targets identifies the edge and indexes the weights array.
+
+    Directed graphs also keep an incoming CSR, whose slots store the
+    position of the same edge in the outgoing arrays. The index of a vertex
+    is its Vertex.index(), so removing vertices from the original graph,
+    which renumbers them, invalidates the snapshot
+    """
+
+    __slots__ = (
+        "_vertices",
+        "_labels",
+        "_edge_count",
+        "_offsets",
+        "_targets",
+        "_weights",
+        "_in_offsets",
+        "_in_targets",
+        "_in_edge_ids",
+        "_edges",
+    )
+
+    def __init__(
+        self,
+        vertices,
+        edge_count,
+        offsets,
+        targets,
+        weights=None,
+        in_offsets=None,
+        in_targets=None,
+        in_edge_ids=None,
+        edges=None,
+        labels=None,
+    ):
+        """Do not use constructor, use instead CompactGraph.from_graph(G) or G.freeze()
+
+        Leaving the incoming arrays as None makes the graph undirected. With
+        vertices None they are created on first access from labels, a
+        sequence of elements or the bytes of a JSON list of them
+        """
+        self._vertices: list[Graph.Vertex] | None = vertices
+        self._labels = labels
+        self._edge_count = edge_count
+        self._offsets = offsets
+        self._targets = targets
+        self._weights = weights
+        self._in_offsets = in_offsets
+        self._in_targets = in_targets
+        self._in_edge_ids = in_edge_ids
+        self._edges: list[Graph.Edge] | None = edges
+
+    @classmethod
+    def from_graph(cls, G: Graph):
+        """Builds a snapshot of G, later changes to G are not reflected"""
+        # keep the dense indices the vertices already have in G
+        vertices = list(G._vertex_list)
+        offsets = array("q", [0])
+        targets = array("q")
+        edges: list[Graph.Edge] = []
+
+        for v in vertices:
+            for u, e in G._outgoing[v].items():
+                targets.append(u._index)
+                edges.append(e)
+            offsets.append(len(targets))
+
+        weights = _edge_weights(edges)
+        if not G.is_directed():
+            return cls(vertices, G.edge_count(), offsets, targets, weights, edges=edges)
+        return cls(
+            vertices,
+            G.edge_count(),
+            offsets,
+            targets,
+            weights,
+            *_incoming_csr(offsets, targets),
+            edges,
+        )
+
+    @classmethod
+    def from_arrays(cls, n: int, sources, targets, weights=None, directed=True):
+        """Builds a snapshot with vertices 0..n-1 from parallel arrays of edge
+        endpoints and, optionally, weights
+
+        Skips building Graph, Vertex and Edge objects per edge, Edge objects
+        are created on demand. The vertex with index i has element i.
+        Duplicated edges are kept as given. Accepts arrays or lists
+        """
+        m = len(sources)
+        sources = array("q", sources)
+        targets = array("q", targets)
+        if weights is not None and not isinstance(weights, array):
+            weights = _number_array(weights)
+            if weights is None:
+                raise ValueError("weights must be numbers")
+        if not directed:
+            # every edge goes in both rows, self loops only once
+            mirror = [k for k in range(m) if sources[k] != targets[k]]
+            sources, targets = (
+                sources + array("q", (targets[k] for k in mirror)),
+                targets + array("q", (sources[k] for k in mirror)),
+            )
+            if weights is not None:
+                weights = weights + array(weights.typecode, (weights[k] for k in mirror))
+
+        # counting sort of the edges by their source
+        offsets = array("q", [0]) * (n + 1)
+        for u in sources:
+            offsets[u + 1] += 1
+        for i in range(n):
+            offsets[i + 1] += offsets[i]
+        fill = offsets[:-1]
+        out_targets = array("q", [0]) * len(sources)
+        out_weights = None if weights is None else weights[:]
+        for k in range(len(sources)):
+            u = sources[k]
+            slot = fill[u]
+            out_targets[slot] = targets[k]
+            if weights is not None:
+                out_weights[slot] = weights[k]
+            fill[u] = slot + 1
+
+        # the vertices are created on first access
+        labels = range(n)
+        if not directed:
+            return cls(None, m, offsets, out_targets, out_weights, labels=labels)
+        return cls(
+            None,
+            m,
+            offsets,
+            out_targets,
+            out_weights,
+            *_incoming_csr(offsets, out_targets),
+            labels=labels,
+        )
+
+    def is_directed(self):
+        """Returns True if the graph is directed"""
+        return self._in_offsets is not None
+
+    def vertex_count(self):
+        """Returns the number of vertices in the graph"""
+        return len(self._offsets) - 1
+
+    def edge_count(self):
+        """Returns the number of edges in the graph"""
+        return self._edge_count
+
+    def vertices(self):
+        """Returns the vertices of the graph ordered by their index"""
+        if self._vertices is None:
+            labels = self._labels
+            if isinstance(labels, (bytes, memoryview)):
+                labels = json.loads(bytes(labels))
+            self._vertices = [Graph.Vertex(x, i) for i, x in enumerate(labels)]
+            self._labels = None
+        return self._vertices
+
+    def vertex(self, i: int):
+        """Returns the vertex with index i"""
+        return self.vertices()[i]
+
+    def index(self, v: Graph.Vertex):
+        """Returns the dense index of the vertex v"""
+        return v._index
+
+    def csr(self, outgoing=True):
+        """Returns the (offsets, targets) arrays for outgoing or incoming edges"""
+        if outgoing or not self.is_directed():
+            return self._offsets, self._targets
+        return self._in_offsets, self._in_targets
+
+    def weights(self):
+        """Returns the edge weights indexed by outgoing position, None if not numeric"""
+        return self._weights
+
+    def edge_id(self, pos: int, outgoing=True):
+        """Returns the outgoing position of the edge found at pos"""
+        if outgoing or not self.is_directed():
+            return pos
+        return self._in_edge_ids[pos]
+
+    def edge(self, pos: int, outgoing=True):
+        """Returns the Edge stored at position pos of the chosen CSR
+
+        Snapshots loaded from disk have no Edge objects, a new one is built
+        """
+        pos = self.edge_id(pos, outgoing)
+        if self._edges is not None:
+            return self._edges[pos]
+        u = bisect_right(self._offsets, pos) - 1
+        x = None if self._weights is None else self._weights[pos]
+        vertices = self.vertices()
+        return Graph.Edge(vertices[u], vertices[self._targets[pos]], x)
+
+    def degree(self, i: int, outgoing=True):
+        """Returns the number of outgoing edges of the vertex with index i
+
+        If directed, the optional parameter can give the number of incoming
+        """
+        offsets, _ = self.csr(outgoing)
+        return offsets[i + 1] - offsets[i]
+
+    def neighbors(self, i: int, outgoing=True):
+        """Returns the indices of the vertices adjacent to the vertex with index i"""
+        offsets, targets = self.csr(outgoing)
+        return targets[offsets[i] : offsets[i + 1]]
+
+    def save(self, path):
+        """Writes the snapshot to path in a binary format readable by CompactGraph.load
+
+        Vertex elements are stored as a JSON label table, so they must be JSON
+        serialisable. Arrays are written in native byte order
+        """
+        labels = json.dumps([v.element() for v in self.vertices()]).encode()
+        flags = 0
+        arrays = [self._offsets, self._targets]
+        if self.is_directed():
+            flags |= _DIRECTED
+        if sys.byteorder == "big":
+            flags |= _BIG_ENDIAN
+        if self._weights is not None:
+            # arrays have a typecode, mapped memoryviews a format
+            typecode = getattr(self._weights, "typecode", None) or self._weights.format
+            flags |= _INT_WEIGHTS if typecode == "q" else _FLOAT_WEIGHTS
+            arrays.append(self._weights)
+        if self.is_directed():
+            arrays += [self._in_offsets, self._in_targets, self._in_edge_ids]
+
+        with open(path, "wb") as f:
+            f.write(
+                _HEADER.pack(
+                    _MAGIC,
+                    _VERSION,
+                    flags,
+                    self.vertex_count(),
+                    len(self._targets),
+                    self._edge_count,
+                    len(labels),
+                )
+            )
+            f.write(labels)
+            # keep the arrays 8-byte aligned
+            f.write(b"\0" * (-f.tell() % 8))
+            for a in arrays:
+                f.write(memoryview(a).cast("B"))
+
+    @classmethod
+    def load(cls, path):
+        """Maps a file written by save into memory without copying the arrays
+
+        The CSR arrays are memoryviews over the mapping, so processes loading
+        the same file share its pages. Use numpy.frombuffer on them if needed.
+        Loading takes constant time, the label table is parsed and new
+        vertices created on the first call to vertices() or vertex(i), which
+        costs about a second per million vertices
+        """
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, flags, n, slots, edge_count, label_size = _HEADER.unpack_from(mm)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a CompactGraph file")
+        if bool(flags & _BIG_ENDIAN) != (sys.byteorder == "big"):
+            raise ValueError(f"{path} was written with a different byte order")
+
+        start = _HEADER.size
+        buffer = memoryview(mm)
+        labels = buffer[start : start + label_size]
+        start += label_size
+        start += -start % 8
+
+        def take(count, typecode="q"):
+            nonlocal start
+            end = start + 8 * count
+            view = buffer[start:end].cast(typecode)
+            start = end
+            return view
+
+        offsets = take(n + 1)
+        targets = take(slots)
+        weights = None
+        if flags & _INT_WEIGHTS:
+            weights = take(slots)
+        elif flags & _FLOAT_WEIGHTS:
+            weights = take(slots, "d")
+        incoming = [None, None, None]
+        if flags & _DIRECTED:
+            incoming = [take(n + 1), take(slots), take(slots)]
+
+        return cls(None, edge_count, offsets, targets, weights, *incoming, labels=labels)
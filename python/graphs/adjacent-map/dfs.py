@@ -1,43 +1,200 @@
 from graph import Graph
+from compact_graph import CompactGraph
+from instrumentation import TraversalStats
 from collections import deque
 
 
+# events yielded by dfs_events
+DISCOVER = "discover"
+FINISH = "finish"
+TREE_EDGE = "tree"
+BACK_EDGE = "back"
+OTHER_EDGE = "other"
+
+
+def dfs_events(G: Graph, roots=None, outgoing=True, seen=()):
+    """Yields the (event, vertex, edge) events of a DFS from every root in turn
+
+    Implements DFS with an explicit stack of incident edge iterators, so
+    the depth is not bound by the recursion limit. Roots default to all
+    the vertices, vertices in seen are treated as already visited.
+    Outgoing parameter can be used to act over incoming edges
+
+    - (DISCOVER, v, e) when v is reached through e, None for a root
+    - (TREE_EDGE, v, e) just before, when e discovers v
+    - (BACK_EDGE, v, e) when e leads to v still on the stack, a cycle;
+      in undirected graphs the tree edge back to the parent is skipped
+    - (OTHER_EDGE, v, e) when e leads to an already finished v
+    - (FINISH, v, e) when all the edges of v were explored
+    """
+    adj = G._outgoing if outgoing else G._incoming
+    undirected = not G.is_directed()
+    # 0 undiscovered, 1 on the stack, 2 finished
+    state = bytearray(G.vertex_count())
+    for v in seen:
+        state[v._index] = 2
+    parent: list[Graph.Edge] = [None] * G.vertex_count()
+
+    for root in G._vertex_list if roots is None else roots:
+        if state[root._index]:
+            continue
+        state[root._index] = 1
+        yield DISCOVER, root, None
+        stack = [(root, iter(adj[root].items()))]
+
+        while stack:
+            v, incident = stack[-1]
+            for u, e in incident:
+                j = u._index
+                if state[j] == 0:
+                    state[j] = 1
+                    parent[j] = e
+                    yield TREE_EDGE, u, e
+                    yield DISCOVER, u, e
+                    stack.append((u, iter(adj[u].items())))
+                    break
+                if state[j] == 1:
+                    if not (undirected and e is parent[v._index]):
+                        yield BACK_EDGE, u, e
+                else:
+                    yield OTHER_EDGE, u, e
+            else:
+                stack.pop()
+                state[v._index] = 2
+                yield FINISH, v, parent[v._index]
+
+
+def dfs_iter(
+    G: Graph,
+    s: Graph.Vertex,
+    max_depth=None,
+    max_vertices=None,
+    until=None,
+    outgoing=True,
+):
+    """Yields (vertex, edge used to discover it, depth in the DFS tree) in DFS
+    preorder, starting at (s, None, 0)
+
+    Vertices are discovered only as they are consumed, so the work is
+    proportional to what is yielded. Vertices deeper than max_depth in the
+    DFS tree are not visited, so some within max_depth hops may be missed;
+    use bfs_iter for exact hop neighbourhoods. At most max_vertices are
+    yielded and the search stops after the first vertex v with until(v) true.
+    Outgoing parameter can be used to act over incoming edges
+    """
+    adj = G._outgoing if outgoing else G._incoming
+    seen = {s}
+    count = 1
+
+    yield s, None, 0
+    if (max_vertices is not None and count >= max_vertices) or (
+        until is not None and until(s)
+    ):
+        return
+    stack = [iter(adj[s].items())]
+
+    while stack:
+        for u, e in stack[-1]:
+            if u not in seen:
+                seen.add(u)
+                yield u, e, len(stack)
+                count += 1
+                if max_vertices is not None and count >= max_vertices:
+                    return
+                if until is not None and until(u):
+                    return
+                if max_depth is None or len(stack) < max_depth:
+                    stack.append(iter(adj[u].items()))
+                    break
+        else:
+            stack.pop()
+
+
 def dfs(
     G: Graph, s: Graph.Vertex, discovered: dict[Graph.Vertex, Graph.Edge], outgoing=True
 ):
     """Assumes argument discovered[s] = None was added
 
-    Implements DFS using recursion
+    Implements DFS on top of dfs_events, vertices already in discovered
+    are not visited again
     Outgoing parameter can be used to act over incoming edges
     """
-    incident = G.incident_edges(s, outgoing)
-    for edge in incident:
-        v = edge.opposite(s)
-        if v not in discovered:
-            discovered[v] = edge
-            dfs(G, v, discovered)
+    seen = [v for v in discovered if v is not s]
+    for event, v, e in dfs_events(G, [s], outgoing, seen):
+        if event is TREE_EDGE:
+            discovered[v] = e
 
 
-def dfs_stack(G: Graph, s: Graph.Vertex, outgoing=True):
+def dfs_stack(
+    G: Graph, s: Graph.Vertex, outgoing=True, indexed=False, *, stats: TraversalStats = None
+):
     """Returns a map with the Vertex as key and the Edge used to discover it as value
 
     Implements DFS using stack
     Outgoing parameter can be used to act over incoming edges
+    With indexed=True returns instead a list indexed by Vertex.index() holding
+    the discovery edges, None for s and for the undiscovered vertices
+    A TraversalStats given as stats gets the counters and the search and
+    result phase timings
     """
+    if stats is not None:
+        stats.start()
+    adj = G._outgoing if outgoing else G._incoming
     stack: deque[Graph.Vertex] = deque()
-    discovered: dict[Graph.Vertex, Graph.Edge] = {}
+    parent: list[Graph.Edge] = [None] * G.vertex_count()
+    seen = bytearray(G.vertex_count())
+    order: list[Graph.Vertex] = []
     stack.append(s)
-    discovered[s] = None
+    seen[s._index] = 1
 
     while stack:
+        if stats is not None:
+            stats.frontier(len(stack))
         v = stack.pop()
-        incident = G.incident_edges(v, outgoing)
-        for edge in incident:
-            w = edge.opposite(v)
-            if w not in discovered:
-                discovered[w] = edge
+        if stats is not None:
+            stats.vertices_settled += 1
+            stats.edges_scanned += len(adj[v])
+        for w, edge in adj[v].items():
+            i = w._index
+            if not seen[i]:
+                seen[i] = 1
+                parent[i] = edge
+                order.append(w)
                 stack.append(w)
+    if stats is not None:
+        stats.lap("search")
 
+    if indexed:
+        return parent
+    discovered: dict[Graph.Vertex, Graph.Edge] = {s: None}
+    for w in order:
+        discovered[w] = parent[w._index]
+    if stats is not None:
+        stats.lap("result")
+    return discovered
+
+
+def dfs_stack_compact(C: CompactGraph, s: Graph.Vertex, outgoing=True):
+    """Same as dfs_stack, but runs over the integer arrays of a CompactGraph"""
+    offsets, targets = C.csr(outgoing)
+    parent = [-1] * C.vertex_count()
+    src = C.index(s)
+    parent[src] = src
+    stack = [src]
+    order = []
+
+    while stack:
+        v = stack.pop()
+        for pos in range(offsets[v], offsets[v + 1]):
+            w = targets[pos]
+            if parent[w] == -1:
+                parent[w] = pos
+                order.append(w)
+                stack.append(w)
+
+    discovered = {s: None}
+    for w in order:
+        discovered[C.vertex(w)] = C.edge(parent[w], outgoing)
     return discovered
 
 
@@ -60,14 +217,12 @@ def construct_path(
 
 
 def test_connectivity(G: Graph, s: Graph.Vertex):
-    """Tests the connectivity of a graph using dfs"""
-    out = {s: None}
-    dfs(G, s, out)
-    if not G.is_directed():
-        return len(out) == G.vertex_count()
-    inc = {s: None}
-    dfs(G, s, inc, False)
-    return len(out) == G.vertex_count() and len(inc) == G.vertex_count()
+    """Tests the connectivity of a graph, strong connectivity if directed
+
+    One pass of strongly_connected_components, s is kept for compatibility
+    """
+    _, count = strongly_connected_components(G)
+    return count == 1
 
 
 def dfs_complete(G: Graph):
@@ -77,25 +232,94 @@ def dfs_complete(G: Graph):
     The nodes with None values are root nodes
     """
     forest = {}
-    for v in G.vertices():
-        if v not in forest:
-            forest[v] = None
-            dfs(G, v, forest)
+    for event, v, e in dfs_events(G):
+        if event is DISCOVER:
+            forest[v] = e
     return forest
 
 
 def dfs_has_cycle(G: Graph, s: Graph.Vertex):
-    def _search_cycle(s: Graph.Vertex, discovered: dict[Graph.Vertex, Graph.Edge]):
-        for e in G.incident_edges(s):
-            v = e.opposite(s)
-            if v not in discovered:
-                discovered[v] = e
-                if _search_cycle(v, discovered):
-                    return True
+    """Returns True if a cycle can be reached from s"""
+    for event, _, _ in dfs_events(G, [s]):
+        if event is BACK_EDGE:
+            return True
+    return False
+
+
+def strongly_connected_components(G: Graph):
+    """Returns (comp, count), comp[i] is the component of the vertex with index i
+
+    Iterative Tarjan, components are numbered in reverse topological order,
+    so every edge between two components goes to a smaller number
+    """
+    adj = G._outgoing
+    n = G.vertex_count()
+    order = [-1] * n
+    low = [0] * n
+    on_stack = bytearray(n)
+    comp = [-1] * n
+    stack: list[int] = []
+    count = 0
+    counter = 0
+
+    for root in G._vertex_list:
+        r = root._index
+        if order[r] != -1:
+            continue
+        order[r] = low[r] = counter
+        counter += 1
+        stack.append(r)
+        on_stack[r] = 1
+        work = [(r, iter(adj[root]))]
+
+        while work:
+            i, incident = work[-1]
+            for u in incident:
+                j = u._index
+                if order[j] == -1:
+                    order[j] = low[j] = counter
+                    counter += 1
+                    stack.append(j)
+                    on_stack[j] = 1
+                    work.append((j, iter(adj[u])))
+                    break
+                if on_stack[j] and order[j] < low[i]:
+                    low[i] = order[j]
             else:
-                # ignore the edge leading back to the parent
-                if discovered[s] is None or e is not discovered[s]:
-                    return True
-        return False
+                work.pop()
+                if work:
+                    p = work[-1][0]
+                    if low[i] < low[p]:
+                        low[p] = low[i]
+                if low[i] == order[i]:
+                    while True:
+                        j = stack.pop()
+                        on_stack[j] = 0
+                        comp[j] = count
+                        if j == i:
+                            break
+                    count += 1
+
+    return comp, count
+
 
-    return _search_cycle(s, {s: None})
+def condensation(G: Graph):
+    """Returns (dag, comp), the directed acyclic graph of the strongly connected
+    components of G and the component of every vertex by Vertex.index()
+
+    The vertex with index c of dag is component c, its element is the list of
+    the vertices of G in it. Components are in reverse topological order
+    """
+    comp, count = strongly_connected_components(G)
+    dag = Graph(True)
+    members: list[list[Graph.Vertex]] = [[] for _ in range(count)]
+    for v in G._vertex_list:
+        members[comp[v._index]].append(v)
+    nodes = [dag.insert_vertex(m) for m in members]
+    for v in G._vertex_list:
+        c = comp[v._index]
+        for u in G._outgoing[v]:
+            d = comp[u._index]
+            if d != c and dag.get_edge(nodes[c], nodes[d]) is None:
+                dag.insert_edge(nodes[c], nodes[d])
+    return dag, comp
@@ -1,29 +1,288 @@
 from graph import Graph
+from query_cache import cached
+from compact_graph import CompactGraph
+from priority_queue import PriorityQueue
+from instrumentation import TraversalStats
+from array import array
 import heapq
+import multiprocessing
 
 
-def dijkstra(G: Graph, s: Graph.Vertex) -> dict[Graph.Vertex, int]:
-    pq : tuple[int,Graph.Vertex] = []
-    distance : dict[Graph.Vertex,int] = {}
+@cached
+def dijkstra(
+    G: Graph,
+    s: Graph.Vertex,
+    indexed=False,
+    *,
+    queue: PriorityQueue = None,
+    stats: TraversalStats = None,
+) -> dict[Graph.Vertex, int]:
+    """Returns a map with the distance from s to every vertex
 
-    heapq.heappush(pq, (0,s))
+    With indexed=True returns instead the list of distances indexed by Vertex.index()
+    An empty PriorityQueue sized for G, such as IndexedHeap or BucketQueue,
+    can replace the default heapq with lazy deletion
+    A TraversalStats given as stats gets the counters and the init, search
+    and result phase timings
+    """
+    if stats is not None:
+        stats.start()
+    adj = G._outgoing
+    distance: list[int] = [float("inf")] * G.vertex_count()
+    distance[s._index] = 0
+    if stats is not None:
+        stats.lap("init")
+
+    if queue is not None:
+        queue.push(s._index, 0)
+        if stats is not None:
+            stats.heap_pushes += 1
+        while queue:
+            d, i = queue.pop()
+            v = G.vertex(i)
+            if stats is not None:
+                stats.frontier(len(queue) + 1)
+                stats.vertices_settled += 1
+                stats.edges_scanned += len(adj[v])
+            for u, e in adj[v].items():
+                j = u._index
+                if distance[j] > e.element() + d:
+                    distance[j] = e.element() + d
+                    queue.push(j, distance[j])
+                    if stats is not None:
+                        stats.edges_relaxed += 1
+                        stats.heap_pushes += 1
+    else:
+        pq: list[tuple[int, int]] = []
+        heapq.heappush(pq, (0, s._index))
+        pops = 0
+        settled = 0
+
+        while pq:
+            if stats is not None:
+                stats.frontier(len(pq))
+                pops += 1
+            d, i = heapq.heappop(pq)
+
+            if d > distance[i]:
+                continue
+
+            v = G.vertex(i)
+            if stats is not None:
+                settled += 1
+                stats.edges_scanned += len(adj[v])
+            for u, e in adj[v].items():
+                j = u._index
+                if distance[j] > e.element() + d:
+                    distance[j] = e.element() + d
+                    heapq.heappush(pq, (distance[j], j))
+
+        if stats is not None:
+            # every pushed entry is popped, the first push is the source
+            stats.vertices_settled += settled
+            stats.heap_pushes += pops
+            stats.edges_relaxed += pops - 1
+            stats.stale_pops += pops - settled
+    if stats is not None:
+        stats.lap("search")
+
+    if indexed:
+        result = distance
+    else:
+        result = {v: distance[v._index] for v in G.vertices()}
+    if stats is not None:
+        stats.lap("result")
+    return result
 
-    for v in G.vertices():
-        if v is s:
-            distance[v] = 0
-        else:
-            distance[v] = float("inf")
+
+def _dijkstra_csr(offsets, targets, weights, src: int) -> list[int]:
+    """Dijkstra over CSR arrays, returns the distances indexed by vertex"""
+    distance = [float("inf")] * (len(offsets) - 1)
+    distance[src] = 0
+    pq = [(0, src)]
 
     while pq:
-        d,v = heapq.heappop(pq)
+        d, v = heapq.heappop(pq)
 
         if d > distance[v]:
             continue
 
-        for e in G.incident_edges(v):
-            u = e.opposite(v)
-            if distance[u] > e.element() + d:
-                distance[u] = e.element() + d
-                heapq.heappush(pq,(distance[u],u))
+        for pos in range(offsets[v], offsets[v + 1]):
+            u = targets[pos]
+            alt = weights[pos] + d
+            if distance[u] > alt:
+                distance[u] = alt
+                heapq.heappush(pq, (alt, u))
 
     return distance
+
+
+def dijkstra_compact(C: CompactGraph, s: Graph.Vertex) -> dict[Graph.Vertex, int]:
+    """Same as dijkstra, but runs over the integer arrays of a CompactGraph
+
+    Heap entries hold vertex indices, so ties never compare vertex elements
+    """
+    offsets, targets = C.csr()
+    weights = C.weights()
+    if weights is None:
+        raise ValueError("dijkstra requires numeric edge elements")
+
+    distance = _dijkstra_csr(offsets, targets, weights, C.index(s))
+    return {C.vertex(i): d for i, d in enumerate(distance)}
+
+
+# CSR arrays of the graph, set once in every worker process of dijkstra_many
+_worker_graph = None
+
+
+def _init_worker(offsets, targets, weights):
+    global _worker_graph
+    _worker_graph = (offsets, targets, weights)
+
+
+def _solve_chunk(sources: list[int]):
+    return [_dijkstra_csr(*_worker_graph, s) for s in sources]
+
+
+def _solve_many(G: Graph, sources, workers=None, chunk_size=16):
+    """Yields the (source, distance list) pairs of dijkstra_many"""
+    C = G.freeze()
+    offsets, targets = C.csr()
+    weights = C.weights()
+    if weights is None:
+        raise ValueError("dijkstra requires numeric edge elements")
+    sources = list(sources)
+
+    if workers == 1:
+        for s in sources:
+            yield s, _dijkstra_csr(offsets, targets, weights, s._index)
+        return
+
+    chunks = [
+        [s._index for s in sources[i : i + chunk_size]]
+        for i in range(0, len(sources), chunk_size)
+    ]
+    # the arrays are inherited on fork, or pickled once per worker otherwise
+    with multiprocessing.Pool(workers, _init_worker, (offsets, targets, weights)) as pool:
+        it = iter(sources)
+        for chunk in pool.imap(_solve_chunk, chunks):
+            for distance in chunk:
+                yield next(it), distance
+
+
+def dijkstra_many(G: Graph, sources, workers=None, chunk_size=16, indexed=False):
+    """Yields (s, distances) for every source s, in the order of sources
+
+    Sources are solved in chunks of chunk_size by a pool of worker processes,
+    os.cpu_count() by default; workers=1 solves them in this process.
+    distances is the same map dijkstra(G, s) returns, or with indexed=True
+    the list of distances indexed by Vertex.index().
+    Stopping the iteration early terminates the pool
+    """
+    for s, distance in _solve_many(G, sources, workers, chunk_size):
+        if indexed:
+            yield s, distance
+        else:
+            yield s, {v: distance[v._index] for v in G.vertices()}
+
+
+def distance_matrix(G: Graph, sources=None, workers=None, chunk_size=16):
+    """Returns a list with one row of distances per source, all vertices by default
+
+    Row i holds the distances from the i-th source indexed by Vertex.index(),
+    stored as array("d") to keep the matrix compact
+    """
+    if sources is None:
+        sources = G._vertex_list
+    return [
+        array("d", distance)
+        for _, distance in _solve_many(G, sources, workers, chunk_size)
+    ]
+
+
+def _walk(parent: dict[Graph.Vertex, Graph.Edge], v: Graph.Vertex):
+    """Follows the parent edges from v, returns the vertices and edges visited"""
+    vertices = [v]
+    edges = []
+    e = parent[v]
+    while e is not None:
+        v = e.opposite(v)
+        vertices.append(v)
+        edges.append(e)
+        e = parent[v]
+    return vertices, edges
+
+
+def shortest_path(G: Graph, s: Graph.Vertex, t: Graph.Vertex):
+    """Returns (distance, vertices, edges) for a shortest path from s to t
+
+    Stops as soon as t is settled and only stores the distances of the
+    vertices reached. Returns (inf, [], []) if t is unreachable
+    """
+    adj = G._outgoing
+    distance: dict[Graph.Vertex, int] = {s: 0}
+    parent: dict[Graph.Vertex, Graph.Edge] = {s: None}
+    # the vertex index breaks ties, so vertices are never compared
+    pq = [(0, s._index, s)]
+
+    while pq:
+        d, _, v = heapq.heappop(pq)
+
+        if d > distance[v]:
+            continue
+
+        if v is t:
+            vertices, edges = _walk(parent, t)
+            vertices.reverse()
+            edges.reverse()
+            return d, vertices, edges
+
+        for u, e in adj[v].items():
+            alt = e.element() + d
+            if u not in distance or alt < distance[u]:
+                distance[u] = alt
+                parent[u] = e
+                heapq.heappush(pq, (alt, u._index, u))
+
+    return float("inf"), [], []
+
+
+def bidirectional_shortest_path(G: Graph, s: Graph.Vertex, t: Graph.Vertex):
+    """Same as shortest_path, but searches forward from s and backward from t
+
+    The backward search follows incoming edges. Both searches stop once the
+    sum of their smallest tentative distances can not improve the best path
+    """
+    adj = (G._outgoing, G._incoming)
+    distance: tuple[dict[Graph.Vertex, int], ...] = ({s: 0}, {t: 0})
+    parent: tuple[dict[Graph.Vertex, Graph.Edge], ...] = ({s: None}, {t: None})
+    pq = ([(0, s._index, s)], [(0, t._index, t)])
+    best = 0 if s is t else float("inf")
+    meet = s if s is t else None
+
+    while pq[0] and pq[1] and pq[0][0][0] + pq[1][0][0] < best:
+        side = 0 if pq[0][0][0] <= pq[1][0][0] else 1
+        d, _, v = heapq.heappop(pq[side])
+        dist = distance[side]
+        other = distance[1 - side]
+
+        if d > dist[v]:
+            continue
+
+        for u, e in adj[side][v].items():
+            alt = e.element() + d
+            if u not in dist or alt < dist[u]:
+                dist[u] = alt
+                parent[side][u] = e
+                heapq.heappush(pq[side], (alt, u._index, u))
+                if u in other and alt + other[u] < best:
+                    best = alt + other[u]
+                    meet = u
+
+    if meet is None:
+        return float("inf"), [], []
+    vertices, edges = _walk(parent[0], meet)
+    vertices.reverse()
+    edges.reverse()
+    back_vertices, back_edges = _walk(parent[1], meet)
+    return best, vertices + back_vertices[1:], edges + back_edges
@@ -0,0 +1,162 @@
+"""Seeded random graph families for load and scale tests
+
+Every generator returns a Graph whose vertex with index i has element i, or
+with compact=True a CompactGraph built straight from the edge arrays, which
+skips the per edge Vertex and Edge objects and is the fast path for large
+graphs. Edge elements are integer weights drawn from 1..max_weight.
+Generated graphs have no self loops and no duplicated edges
+"""
+
+from array import array
+import random
+from graph import Graph
+from compact_graph import CompactGraph
+
+
+def _build(n: int, sources, targets, weights, directed: bool, compact: bool):
+    if compact:
+        return CompactGraph.from_arrays(n, sources, targets, weights, directed)
+    G = Graph(directed)
+    vertices = {i: G.insert_vertex(i) for i in range(n)}
+    G._bulk_insert(zip(sources, targets, weights), vertices, weighted=True)
+    return G
+
+
+def _weights(rng: random.Random, m: int, max_weight: int):
+    # int(random() * k) is several times faster than randrange(k)
+    uniform = rng.random
+    return array("q", (int(uniform() * max_weight) + 1 for _ in range(m)))
+
+
+def erdos_renyi(n: int, m: int, directed=False, max_weight=100, seed=None, compact=False):
+    """Returns a uniformly random graph with n vertices and m edges, G(n, m)"""
+    limit = n * (n - 1) if directed else n * (n - 1) // 2
+    if m > limit:
+        raise ValueError(f"at most {limit} edges fit in {n} vertices")
+    rng = random.Random(seed)
+    uniform = rng.random
+    seen: set[int] = set()
+    sources = array("q")
+    targets = array("q")
+    while len(sources) < m:
+        u = int(uniform() * n)
+        v = int(uniform() * n)
+        if u == v:
+            continue
+        if not directed and u > v:
+            u, v = v, u
+        key = u * n + v
+        if key not in seen:
+            seen.add(key)
+            sources.append(u)
+            targets.append(v)
+    return _build(n, sources, targets, _weights(rng, m, max_weight), directed, compact)
+
+
+def rmat(
+    scale: int,
+    edge_factor=16,
+    a=0.57,
+    b=0.19,
+    c=0.19,
+    directed=True,
+    max_weight=100,
+    seed=None,
+    compact=False,
+):
+    """Returns an R-MAT (recursive Kronecker) graph with 2**scale vertices
+
+    Each edge picks one quadrant of the adjacency matrix per bit of the
+    vertex ids with probabilities a, b, c and 1 - a - b - c, which gives the
+    skewed degrees and small diameter of social and web graphs. About
+    edge_factor * 2**scale edges are drawn, duplicates and self loops are
+    dropped
+    """
+    n = 1 << scale
+    rng = random.Random(seed)
+    ab = a + b
+    abc = a + b + c
+    seen: set[int] = set()
+    sources = array("q")
+    targets = array("q")
+    uniform = rng.random
+    for _ in range(edge_factor * n):
+        u = v = 0
+        for _ in range(scale):
+            r = uniform()
+            u <<= 1
+            v <<= 1
+            if r >= ab:
+                u |= 1
+            if a <= r < ab or r >= abc:
+                v |= 1
+        if u == v:
+            continue
+        if not directed and u > v:
+            u, v = v, u
+        key = u * n + v
+        if key not in seen:
+            seen.add(key)
+            sources.append(u)
+            targets.append(v)
+    weights = _weights(rng, len(sources), max_weight)
+    return _build(n, sources, targets, weights, directed, compact)
+
+
+def grid(rows: int, cols: int, diagonals=False, max_weight=100, seed=None, compact=False):
+    """Returns an undirected rows x cols grid, a stand-in for road networks
+
+    The vertex at (r, c) has index r * cols + c. With diagonals=True each
+    cell is also joined to its lower diagonal neighbours
+    """
+    rng = random.Random(seed)
+    sources = array("q")
+    targets = array("q")
+    for r in range(rows):
+        for c in range(cols):
+            u = r * cols + c
+            if c + 1 < cols:
+                sources.append(u)
+                targets.append(u + 1)
+            if r + 1 < rows:
+                sources.append(u)
+                targets.append(u + cols)
+                if diagonals:
+                    if c + 1 < cols:
+                        sources.append(u)
+                        targets.append(u + cols + 1)
+                    if c > 0:
+                        sources.append(u)
+                        targets.append(u + cols - 1)
+    weights = _weights(rng, len(sources), max_weight)
+    return _build(rows * cols, sources, targets, weights, False, compact)
+
+
+def random_dag(n: int, m: int, max_weight=100, seed=None, compact=False):
+    """Returns a random directed acyclic graph with n vertices and m edges
+
+    Edges go forward in a hidden random order of the vertices, so the
+    insertion order is not a topological order
+    """
+    if m > n * (n - 1) // 2:
+        raise ValueError(f"at most {n * (n - 1) // 2} edges fit in a DAG of {n} vertices")
+    rng = random.Random(seed)
+    rank = list(range(n))
+    rng.shuffle(rank)
+    uniform = rng.random
+    seen: set[int] = set()
+    sources = array("q")
+    targets = array("q")
+    while len(sources) < m:
+        i = int(uniform() * n)
+        j = int(uniform() * n)
+        if i == j:
+            continue
+        if i > j:
+            i, j = j, i
+        key = i * n + j
+        if key not in seen:
+            seen.add(key)
+            sources.append(rank[i])
+            targets.append(rank[j])
+    return _build(n, sources, targets, _weights(rng, m, max_weight), True, compact)
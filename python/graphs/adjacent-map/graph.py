@@ -1,4 +1,5 @@
 from __future__ import annotations
+from array import array
 from typing import Any
 
 
@@ -7,16 +8,21 @@ class Graph:
     class Vertex:
         """Lightweight vertex structure for a graph"""
 
-        __slots__ = "_element"
+        __slots__ = ("_element", "_index")
 
-        def __init__(self, x: Any):
+        def __init__(self, x: Any, index=-1):
             """Do not use constructor, use instead Graph.insert_vertex(x)"""
             self._element = x
+            self._index = index
 
         def element(self):
             """Return the element associated with the vertex"""
             return self._element
 
+        def index(self):
+            """Return the dense index of the vertex in its graph, from 0 to n-1"""
+            return self._index
+
         def __hash__(self):
             return hash(id(self))
 
@@ -58,7 +64,7 @@ class Graph:
             return self._element
 
         def __hash__(self):
-            return hash((self._origin, self._destination))
+            return hash(id(self))
 
         def __str__(self):
             return f"Edge Element {self.endpoints()}: {self.element()}"
@@ -71,6 +77,15 @@ class Graph:
         self._incoming: dict[Graph.Vertex, dict[Graph.Vertex, Graph.Edge]] = (
             {} if directed else self._outgoing
         )
+        # vertices by dense index, lets algorithms keep state in lists
+        self._vertex_list: list[Graph.Vertex] = []
+        # registry of the edges, kept up to date by insert_edge
+        self._edges: dict[Graph.Edge, None] = {}
+        # bumped by every change, lets derived results detect they are stale
+        self._version = 0
+        self._cache = None
+        self._components = None
+        self._topological = None
 
     def is_directed(self):
         """Returns True if the graph is directed"""
@@ -84,18 +99,20 @@ class Graph:
         """Returns an iteration of all the vertices present in the graph"""
         return self._outgoing.keys()
 
+    def vertex(self, i: int):
+        """Returns the vertex with dense index i"""
+        return self._vertex_list[i]
+
     def edge_count(self):
         """Returns the number of edges in the graph"""
-        total = sum(len(self._outgoing[v]) for v in self._outgoing)
-        # sum of degrees, hand shake lemma
-        return total if self.is_directed() else total // 2
+        return len(self._edges)
 
     def edges(self):
-        """Returns a set of all the edges in the graph"""
-        unique: set[Graph.Edge] = set()
-        for adjs in self._outgoing.values():
-            unique.update(adjs.values())
-        return unique
+        """Returns a live set-like view of all the edges in the graph
+
+        The view reflects later changes, do not modify the graph while iterating
+        """
+        return self._edges.keys()
 
     def get_edge(self, u: Vertex, v: Vertex):
         """Returns the edge (u,v), None if does not exists"""
@@ -106,7 +123,7 @@ class Graph:
 
         If directed, the optional parameter can give the number of incoming 
         """
-        adj = self._outgoing[v] if outgoing else self._incoming
+        adj = self._outgoing if outgoing else self._incoming
         return len(adj[v])
 
     def incident_edges(self, v: Vertex, outgoing=True):
@@ -120,15 +137,228 @@ class Graph:
 
     def insert_vertex(self, x=None):
         """Inserts and returns a new vertex into graph with element x"""
-        v = self.Vertex(x)
+        self._version += 1
+        v = self.Vertex(x, len(self._vertex_list))
+        self._vertex_list.append(v)
         self._outgoing[v] = {}
         if self.is_directed():
             self._incoming[v] = {}
+        if self._components is not None:
+            self._components._vertex_inserted()
+        if self._topological is not None:
+            self._topological._vertex_inserted(v)
         return v
 
     def insert_edge(self, u, v, x=None):
         """Inserts and returns a new edge into the graph with element x"""
+        if self._topological is not None:
+            self._topological._edge_inserting(u, v)
+        self._version += 1
+        old = self._outgoing[u].get(v)
+        if old is not None:
+            del self._edges[old]
         e = self.Edge(u, v, x)
         self._outgoing[u][v] = e
         self._incoming[v][u] = e
+        self._edges[e] = None
+        if self._components is not None:
+            self._components._edge_inserted(u, v)
         return e
+
+    def _bulk_insert(self, edges, vertices: dict[Any, Graph.Vertex], weighted=False):
+        """Inserts (u, v) or (u, v, x) label tuples, interning labels in vertices
+
+        Writes straight into the adjacency maps instead of calling
+        insert_vertex/insert_edge once per item
+        """
+        outgoing = self._outgoing
+        incoming = self._incoming
+        directed = outgoing is not incoming
+        vertex_list = self._vertex_list
+        registry = self._edges
+        Vertex = self.Vertex
+        Edge = self.Edge
+        self._version += 1
+        if self._components is not None:
+            self._components._invalidate()
+        if self._topological is not None:
+            self._topological._invalidate()
+
+        for item in edges:
+            if weighted:
+                a, b, x = item
+            else:
+                a, b = item
+                x = None
+            u = vertices.get(a)
+            if u is None:
+                u = vertices[a] = Vertex(a, len(vertex_list))
+                vertex_list.append(u)
+                outgoing[u] = {}
+                if directed:
+                    incoming[u] = {}
+            v = vertices.get(b)
+            if v is None:
+                v = vertices[b] = Vertex(b, len(vertex_list))
+                vertex_list.append(v)
+                outgoing[v] = {}
+                if directed:
+                    incoming[v] = {}
+            old = outgoing[u].get(v)
+            if old is not None:
+                del registry[old]
+            e = Edge(u, v, x)
+            outgoing[u][v] = e
+            incoming[v][u] = e
+            registry[e] = None
+
+    def remove_edge(self, e: Edge):
+        """Removes the edge e from the graph"""
+        del self._edges[e]
+        self._version += 1
+        if self._components is not None:
+            self._components._invalidate()
+        u, v = e.endpoints()
+        del self._outgoing[u][v]
+        # an undirected self loop is stored only once
+        if self.is_directed() or u is not v:
+            del self._incoming[v][u]
+
+    def remove_vertex(self, v: Vertex):
+        """Removes the vertex v and all its incident edges from the graph
+
+        The last vertex takes over the dense index of v, so indices stay 0..n-1
+        """
+        self._version += 1
+        if self._components is not None:
+            self._components._invalidate()
+        if self._topological is not None:
+            self._topological._invalidate()
+        for e in list(self._outgoing[v].values()):
+            self.remove_edge(e)
+        del self._outgoing[v]
+        if self.is_directed():
+            for e in list(self._incoming[v].values()):
+                self.remove_edge(e)
+            del self._incoming[v]
+
+        last = self._vertex_list.pop()
+        if last is not v:
+            self._vertex_list[v._index] = last
+            last._index = v._index
+        v._index = -1
+
+    @classmethod
+    def from_edges(cls, edges, directed=False, weighted=False):
+        """Builds a graph from an iteration of (u, v) or, if weighted, (u, v, x) tuples
+
+        u and v are labels, a vertex is created the first time a label is seen.
+        Returns the graph and the map from labels to vertices
+        """
+        G = cls(directed)
+        vertices: dict[Any, Graph.Vertex] = {}
+        G._bulk_insert(edges, vertices, weighted)
+        return G, vertices
+
+    @classmethod
+    def load_edgelist(
+        cls,
+        path,
+        directed=False,
+        weighted=False,
+        delimiter=None,
+        label_type=str,
+        weight_type=float,
+        chunk_size=1 << 20,
+    ):
+        """Builds a graph from a text edge list with one "u v [x]" edge per line
+
+        Use delimiter="," for CSV files. Blank lines and lines starting with
+        "#" are skipped. The file is read in chunks of about chunk_size bytes.
+        Returns the graph and the map from labels to vertices
+        """
+        G = cls(directed)
+        vertices: dict[Any, Graph.Vertex] = {}
+
+        def parse(lines):
+            for line in lines:
+                line = line.strip()
+                if not line or line[0] == "#":
+                    continue
+                fields = line.split(delimiter)
+                if weighted:
+                    yield (
+                        label_type(fields[0].strip()),
+                        label_type(fields[1].strip()),
+                        weight_type(fields[2]),
+                    )
+                else:
+                    yield label_type(fields[0].strip()), label_type(fields[1].strip())
+
+        with open(path) as f:
+            while lines := f.readlines(chunk_size):
+                G._bulk_insert(parse(lines), vertices, weighted)
+        return G, vertices
+
+    def to_matrix(self, missing=float("inf")):
+        """Returns the dense weight matrix of the graph as a list of array("d") rows
+
+        Entry [i][j] is the element of the edge from the vertex with index i to
+        the vertex with index j, 1 if the element is None, and missing if
+        there is no edge. numpy.array(G.to_matrix()) gives an ndarray
+        """
+        n = len(self._vertex_list)
+        rows = [array("d", [missing]) * n for _ in range(n)]
+        for v in self._vertex_list:
+            row = rows[v._index]
+            for u, e in self._outgoing[v].items():
+                x = e.element()
+                row[u._index] = 1 if x is None else x
+        return rows
+
+    def enable_cache(self, maxsize=128, max_cost=None):
+        """Attaches and returns a QueryCache memoizing dijkstra and bfs_queue results
+
+        The cache is emptied whenever the graph changes
+        """
+        from query_cache import QueryCache
+
+        self._cache = QueryCache(self, maxsize, max_cost)
+        return self._cache
+
+    def disable_cache(self):
+        """Detaches the query cache, if any"""
+        self._cache = None
+
+    def track_components(self):
+        """Attaches and returns a ComponentTracker answering connectivity queries
+
+        The tracker is updated by insert_edge, only for undirected graphs
+        """
+        from union_find import ComponentTracker
+
+        if self.is_directed():
+            raise ValueError("components can only be tracked in undirected graphs")
+        if self._components is None:
+            self._components = ComponentTracker(self)
+        return self._components
+
+    def track_topological_order(self):
+        """Attaches and returns a TopologicalOrder kept up to date by insert_edge
+
+        From then on insert_edge raises ValueError for edges closing a cycle,
+        only for directed acyclic graphs
+        """
+        from topological_sorting import TopologicalOrder
+
+        if not self.is_directed():
+            raise ValueError("topological orders only exist in directed graphs")
+        if self._topological is None:
+            self._topological = TopologicalOrder(self)
+        return self._topological
+
+    def freeze(self):
+        """Returns an immutable CompactGraph (CSR) snapshot of the graph"""
+        from compact_graph import CompactGraph
+
+        return CompactGraph.from_graph(self)
@@ -0,0 +1,60 @@
+import time
+
+
+class TraversalStats:
+    """Counters and phase timings filled in by a traversal called with stats=
+
+    Traversals only touch the object once per settled vertex or popped
+    entry, and skip all of it when no stats object is given
+
+    - vertices_settled: vertices taken out of the queue or stack and expanded
+    - edges_scanned: edges inspected while expanding them
+    - edges_relaxed: edges that improved a distance (dijkstra)
+    - heap_pushes, stale_pops: priority queue entries pushed, and popped
+      after their vertex was already settled (dijkstra)
+    - peak_frontier: largest size reached by the queue, heap or stack
+    - phases: seconds spent in each named phase
+    """
+
+    __slots__ = (
+        "vertices_settled",
+        "edges_scanned",
+        "edges_relaxed",
+        "heap_pushes",
+        "stale_pops",
+        "peak_frontier",
+        "phases",
+        "_last",
+    )
+
+    def __init__(self):
+        self.vertices_settled = 0
+        self.edges_scanned = 0
+        self.edges_relaxed = 0
+        self.heap_pushes = 0
+        self.stale_pops = 0
+        self.peak_frontier = 0
+        self.phases: dict[str, float] = {}
+        self._last = time.perf_counter()
+
+    def start(self):
+        """Starts timing a new phase"""
+        self._last = time.perf_counter()
+
+    def lap(self, name: str):
+        """Adds the time since the last start or lap to the phase name"""
+        now = time.perf_counter()
+        self.phases[name] = self.phases.get(name, 0.0) + now - self._last
+        self._last = now
+
+    def frontier(self, size: int):
+        """Records the current size of the queue, heap or stack"""
+        if size > self.peak_frontier:
+            self.peak_frontier = size
+
+    def as_dict(self):
+        """Returns the counters and phases as a plain dictionary"""
+        return {name: getattr(self, name) for name in self.__slots__ if name[0] != "_"}
+
+    def __repr__(self):
+        return f"TraversalStats({self.as_dict()})"
@@ -0,0 +1,143 @@
+from abc import ABC, abstractmethod
+from array import array
+
+
+class PriorityQueue(ABC):
+    """Abstract min priority queue of integer items 0..n-1 supporting decrease-key"""
+
+    @abstractmethod
+    def push(self, item: int, key):
+        """Inserts item with key, or lowers its key if item is already queued"""
+        raise NotImplementedError("Must be implemented by subclass")
+
+    @abstractmethod
+    def pop(self):
+        """Removes and returns the (key, item) pair with the smallest key"""
+        raise NotImplementedError("Must be implemented by subclass")
+
+    @abstractmethod
+    def __len__(self):
+        """Returns the number of queued items"""
+        raise NotImplementedError("Must be implemented by subclass")
+
+    def is_empty(self):
+        """Returns True if no item is queued"""
+        return len(self) == 0
+
+
+class IndexedHeap(PriorityQueue):
+    """d-ary heap that keeps the position of every item, so keys are decreased in place
+
+    Each item is in the heap at most once, unlike heapq with lazy deletion
+    """
+
+    def __init__(self, capacity: int, d=2):
+        self._d = d
+        self._heap: list[int] = []
+        self._keys: list = [None] * capacity
+        self._pos = array("q", [-1]) * capacity
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, item: int, key):
+        p = self._pos[item]
+        if p == -1:
+            self._heap.append(item)
+            self._keys[item] = key
+            self._sift_up(len(self._heap) - 1)
+        elif key < self._keys[item]:
+            self._keys[item] = key
+            self._sift_up(p)
+
+    def pop(self):
+        heap = self._heap
+        top = heap[0]
+        last = heap.pop()
+        if heap:
+            heap[0] = last
+            self._pos[last] = 0
+            self._sift_down(0)
+        self._pos[top] = -1
+        return self._keys[top], top
+
+    def _sift_up(self, i: int):
+        heap, keys, pos, d = self._heap, self._keys, self._pos, self._d
+        item = heap[i]
+        key = keys[item]
+        while i > 0:
+            parent = (i - 1) // d
+            other = heap[parent]
+            if keys[other] <= key:
+                break
+            heap[i] = other
+            pos[other] = i
+            i = parent
+        heap[i] = item
+        pos[item] = i
+
+    def _sift_down(self, i: int):
+        heap, keys, pos, d = self._heap, self._keys, self._pos, self._d
+        n = len(heap)
+        item = heap[i]
+        key = keys[item]
+        while True:
+            first = d * i + 1
+            if first >= n:
+                break
+            child = first
+            for c in range(first + 1, min(first + d, n)):
+                if keys[heap[c]] < keys[heap[child]]:
+                    child = c
+            if keys[heap[child]] >= key:
+                break
+            heap[i] = heap[child]
+            pos[heap[i]] = i
+            i = child
+        heap[i] = item
+        pos[item] = i
+
+
+class BucketQueue(PriorityQueue):
+    """Monotone bucket queue for Dial's algorithm
+
+    Keys must be integers and every pushed key must lie between the last
+    popped key and that key plus max_step (the largest edge weight), so
+    max_step + 1 circular buckets are enough. push and pop are O(1)
+    amortised, plus the empty buckets scanned between keys
+    """
+
+    def __init__(self, capacity: int, max_step: int):
+        self._buckets: list[list[int]] = [[] for _ in range(max_step + 1)]
+        self._keys: list[int] = [None] * capacity
+        self._current = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def push(self, item: int, key: int):
+        if not self._current <= key < self._current + len(self._buckets):
+            raise ValueError(f"key {key} outside the window of the bucket queue")
+        old = self._keys[item]
+        if old is None:
+            self._size += 1
+        elif key >= old:
+            return
+        # a previous entry of item stays in its bucket and is skipped when popped
+        self._keys[item] = key
+        self._buckets[key % len(self._buckets)].append(item)
+
+    def pop(self):
+        if self._size == 0:
+            raise IndexError("pop from an empty queue")
+        keys = self._keys
+        while True:
+            bucket = self._buckets[self._current % len(self._buckets)]
+            while bucket:
+                item = bucket.pop()
+                if keys[item] == self._current:
+                    keys[item] = None
+                    self._size -= 1
+                    return self._current, item
+            self._current += 1
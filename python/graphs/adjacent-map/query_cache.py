@@ -0,0 +1,103 @@
+from collections import OrderedDict, namedtuple
+from functools import wraps
+
+CacheInfo = namedtuple(
+    "CacheInfo", ["hits", "misses", "evictions", "invalidations", "size", "cost"]
+)
+
+
+def _cost(result):
+    """Returns the size of a result, used as its cost in the cache"""
+    try:
+        return len(result)
+    except TypeError:
+        return 1
+
+
+class QueryCache:
+    """LRU cache of per source query results for one graph
+
+    Do not use constructor, use instead Graph.enable_cache(). The cache is
+    emptied whenever the version of the graph, bumped by every change,
+    differs from the one the results were computed on. At most maxsize
+    results are kept and, if max_cost is given, their total size stays
+    below it, evicting the least recently used first.
+
+    Cached results are shared between callers and must not be modified
+    """
+
+    def __init__(self, G, maxsize=128, max_cost=None):
+        self._graph = G
+        self._maxsize = maxsize
+        self._max_cost = max_cost
+        self._results: OrderedDict = OrderedDict()
+        self._version = G._version
+        self._cost = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def call(self, func, args: tuple, kwargs: dict):
+        """Returns func(G, *args, **kwargs), computing it only on a miss"""
+        if self._version != self._graph._version:
+            self.clear()
+            self._version = self._graph._version
+            self._invalidations += 1
+
+        key = (func, args, tuple(sorted(kwargs.items())))
+        results = self._results
+        if key in results:
+            self._hits += 1
+            results.move_to_end(key)
+            return results[key][0]
+
+        self._misses += 1
+        result = func(self._graph, *args, **kwargs)
+        cost = _cost(result)
+        results[key] = (result, cost)
+        self._cost += cost
+        while len(results) > self._maxsize or (
+            self._max_cost is not None and self._cost > self._max_cost and len(results) > 1
+        ):
+            _, (_, old) = results.popitem(last=False)
+            self._cost -= old
+            self._evictions += 1
+        return result
+
+    def clear(self):
+        """Removes all the cached results, statistics are kept"""
+        self._results.clear()
+        self._cost = 0
+
+    def cache_info(self):
+        """Returns the hit, miss, eviction and invalidation counts and the current size"""
+        return CacheInfo(
+            self._hits,
+            self._misses,
+            self._evictions,
+            self._invalidations,
+            len(self._results),
+            self._cost,
+        )
+
+
+# keyword arguments that make a call skip the cache
+_UNCACHED = ("queue", "stats")
+
+
+def cached(func):
+    """Makes func(G, ...) use the cache attached to G, if any
+
+    Calls given a queue always run, a fresh queue would never hit and the
+    cache would keep it alive. Calls given a stats object always run, so the
+    stats get filled in. Both must be passed by keyword
+    """
+
+    @wraps(func)
+    def wrapper(G, *args, **kwargs):
+        if G._cache is None or any(kwargs.get(name) is not None for name in _UNCACHED):
+            return func(G, *args, **kwargs)
+        return G._cache.call(func, args, kwargs)
+
+    return wrapper
@@ -0,0 +1,117 @@
+from array import array
+import random
+from graph import Graph
+from dfs import strongly_connected_components
+
+
+class ReachabilityIndex:
+    """Answers "can u reach v?" on large graphs without a traversal per query
+
+    The index is built over the condensation of the graph, where every
+    strongly connected component is a node, and keeps for each node:
+
+    - its Tarjan number, edges always go to smaller numbers
+    - its level, the length of the longest path to a sink
+    - one GRAIL interval [low, rank] per random post-order labeling,
+      if u reaches v the interval of v is contained in the one of u
+
+    A query fails one of these O(labelings) checks for most unreachable
+    pairs. Otherwise a DFS over the condensation runs, pruned by the same
+    checks, and it stops when v is found.
+
+    Build time is O(V + E) for the condensation plus O(labelings * (C + E'))
+    for C components and E' condensation edges. Memory is the component
+    of every vertex, the E' condensation edges and (2 * labelings + 1)
+    integers per component. The index is a snapshot, later changes to the
+    graph are not reflected
+    """
+
+    def __init__(self, G: Graph, labelings=2, seed=0):
+        comp, count = strongly_connected_components(G)
+        self._comp = comp
+        successors: list[set[int]] = [set() for _ in range(count)]
+        for v in G._vertex_list:
+            c = comp[v._index]
+            for u in G._outgoing[v]:
+                d = comp[u._index]
+                if d != c:
+                    successors[c].add(d)
+        self._succ = [array("q", sorted(s)) for s in successors]
+
+        # successors have smaller numbers, so their levels are already known
+        level = array("q", [0]) * count
+        for c in range(count):
+            for d in self._succ[c]:
+                if level[d] + 1 > level[c]:
+                    level[c] = level[d] + 1
+        self._level = level
+
+        rng = random.Random(seed)
+        self._labels = [self._label(rng) for _ in range(labelings)]
+
+    def _label(self, rng: random.Random):
+        """Returns the (low, rank) arrays of one random post-order traversal"""
+        count = len(self._succ)
+        rank = array("q", [-1]) * count
+        low = array("q", [0]) * count
+        roots = list(range(count))
+        rng.shuffle(roots)
+        counter = 0
+
+        for root in roots:
+            if rank[root] != -1:
+                continue
+            rank[root] = -2
+            stack = [(root, self._shuffled(root, rng))]
+            while stack:
+                c, children = stack[-1]
+                for d in children:
+                    if rank[d] == -1:
+                        rank[d] = -2
+                        stack.append((d, self._shuffled(d, rng)))
+                        break
+                else:
+                    stack.pop()
+                    rank[c] = counter
+                    smallest = counter
+                    for d in self._succ[c]:
+                        if low[d] < smallest:
+                            smallest = low[d]
+                    low[c] = smallest
+                    counter += 1
+        return low, rank
+
+    def _shuffled(self, c: int, rng: random.Random):
+        children = list(self._succ[c])
+        rng.shuffle(children)
+        return iter(children)
+
+    def _may_reach(self, a: int, b: int):
+        """Returns False if component a can not reach component b"""
+        if a < b or self._level[a] <= self._level[b]:
+            return False
+        for low, rank in self._labels:
+            if low[b] < low[a] or rank[b] > rank[a]:
+                return False
+        return True
+
+    def reachable(self, u: Graph.Vertex, v: Graph.Vertex):
+        """Returns True if there is a path from u to v, a vertex reaches itself"""
+        a = self._comp[u._index]
+        b = self._comp[v._index]
+        if a == b:
+            return True
+        if not self._may_reach(a, b):
+            return False
+
+        seen = {a}
+        stack = [a]
+        while stack:
+            c = stack.pop()
+            for d in self._succ[c]:
+                if d == b:
+                    return True
+                if d not in seen and self._may_reach(d, b):
+                    seen.add(d)
+                    stack.append(d)
+        return False
@@ -0,0 +1,359 @@
+"""Asyncio server answering shortest path queries over one graph in memory
+
+Messages in both directions are JSON objects framed by a 4-byte big-endian
+length. A request is {"id": ..., "op": ..., ...} and its response
+{"id": ..., "result": ...} or {"id": ..., "error": message}; responses on a
+connection may come out of order when requests are pipelined. Ops:
+
+- "dijkstra" and "bfs" with a "source" label answer [[label, distance], ...]
+  for the reachable vertices, or with a "targets" list of labels the
+  distances of those vertices, null if unreachable. bfs counts edges
+- "info" answers the vertex and edge counts, "ping" answers "pong"
+
+Concurrent queries from the same source share one computation, which runs
+in a pool of worker processes so the event loop keeps serving. At most
+max_pending requests are in flight, after that the server stops reading
+from its connections and the clients block on their socket buffers.
+Run python server.py edges.txt to serve an edge list
+"""
+
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import json
+import struct
+import sys
+from graph import Graph
+import dijkstra
+from dijkstra import _dijkstra_csr, _init_worker
+
+_LENGTH = struct.Struct(">I")
+
+
+def _search(op: str, src: int, graph=None):
+    """Returns the distances from src indexed by vertex, None if unreachable
+
+    Worker processes use the graph set by dijkstra._init_worker
+    """
+    offsets, targets, weights = graph or dijkstra._worker_graph
+    if op == "dijkstra":
+        inf = float("inf")
+        return [None if d == inf else d for d in _dijkstra_csr(offsets, targets, weights, src)]
+    hops = [None] * (len(offsets) - 1)
+    hops[src] = 0
+    order = [src]
+    for v in order:
+        for pos in range(offsets[v], offsets[v + 1]):
+            u = targets[pos]
+            if hops[u] is None:
+                hops[u] = hops[v] + 1
+                order.append(u)
+    return hops
+
+
+async def _read_frame(reader: asyncio.StreamReader, limit: int):
+    """Returns the bytes of the next message, raises IncompleteReadError at the end"""
+    (size,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+    if size > limit:
+        raise ValueError(f"message of {size} bytes exceeds the limit of {limit}")
+    return await reader.readexactly(size)
+
+
+def _frame(message) -> bytes:
+    data = json.dumps(message, separators=(",", ":")).encode()
+    return _LENGTH.pack(len(data)) + data
+
+
+class GraphServer:
+    """Serves dijkstra and bfs queries over a snapshot of G
+
+    Searches run in a pool of worker processes, os.cpu_count() by default;
+    workers=0 runs them in the default thread pool of the event loop
+    instead, cheaper for small graphs and tests. Later changes to G are not
+    seen by the server
+    """
+
+    def __init__(self, G: Graph, workers=None, max_pending=64, max_message=1 << 24):
+        C = G.freeze()
+        offsets, targets = C.csr()
+        self._graph = (offsets, targets, C.weights())
+        self._directed = G.is_directed()
+        self._edge_count = G.edge_count()
+        self._labels = [v.element() for v in C.vertices()]
+        self._index = {x: i for i, x in enumerate(self._labels)}
+        self._executor = None
+        if workers != 0:
+            self._executor = ProcessPoolExecutor(workers, None, _init_worker, self._graph)
+        self._max_message = max_message
+        self._max_pending = max_pending
+        self._slots: asyncio.Semaphore = None
+        self._inflight: dict[tuple[str, int], asyncio.Future] = {}
+        self._server: asyncio.AbstractServer = None
+        # open connections, closed by close() so their handlers finish
+        self._connections: dict[asyncio.Task, asyncio.StreamWriter] = {}
+        self._stats = dict.fromkeys(
+            ("requests", "computations", "coalesced", "pending", "peak_pending"), 0
+        )
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Starts listening on a TCP port, 0 picks a free one, see address()"""
+        self._slots = asyncio.Semaphore(self._max_pending)
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self
+
+    async def start_unix(self, path):
+        """Starts listening on a Unix socket at path"""
+        self._slots = asyncio.Semaphore(self._max_pending)
+        self._server = await asyncio.start_unix_server(self._handle, path)
+        return self
+
+    def address(self):
+        """Returns the (host, port) pair or the path the server listens on"""
+        return self._server.sockets[0].getsockname()
+
+    def stats(self):
+        """Returns the counts of requests, computations and coalesced queries,
+        and the current and peak number of requests in flight
+        """
+        return dict(self._stats)
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        """Stops listening, closes the connections and shuts the worker pool down"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for writer in self._connections.values():
+            writer.close()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        if self._executor is not None:
+            # waiting for the workers to exit must not block the event loop
+            await asyncio.to_thread(self._executor.shutdown, cancel_futures=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        lock = asyncio.Lock()
+        tasks = set()
+        self._connections[asyncio.current_task()] = writer
+        try:
+            while True:
+                try:
+                    data = await _read_frame(reader, self._max_message)
+                except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+                    break
+                # once max_pending requests are in flight stop reading, idle
+                # connections hold no slot
+                await self._slots.acquire()
+                stats = self._stats
+                stats["requests"] += 1
+                stats["pending"] += 1
+                stats["peak_pending"] = max(stats["peak_pending"], stats["pending"])
+                task = asyncio.create_task(self._respond(data, writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            del self._connections[asyncio.current_task()]
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _respond(self, data: bytes, writer: asyncio.StreamWriter, lock: asyncio.Lock):
+        try:
+            request_id = None
+            try:
+                request = json.loads(data)
+                if not isinstance(request, dict):
+                    raise ValueError("a request must be a JSON object")
+                request_id = request.get("id")
+                response = _frame({"id": request_id, "result": await self._answer(request)})
+            except Exception as e:
+                # every request gets a response, also when the worker pool breaks
+                response = _frame({"id": request_id, "error": str(e) or type(e).__name__})
+            try:
+                async with lock:
+                    writer.write(response)
+                    await writer.drain()
+            except ConnectionError:
+                pass
+        finally:
+            self._stats["pending"] -= 1
+            self._slots.release()
+
+    async def _answer(self, request: dict):
+        op = request.get("op")
+        if op == "ping":
+            return "pong"
+        if op == "info":
+            return {
+                "vertices": len(self._labels),
+                "edges": self._edge_count,
+                "directed": self._directed,
+            }
+        if op not in ("dijkstra", "bfs"):
+            raise ValueError(f"unknown op {op!r}")
+        if op == "dijkstra" and self._graph[2] is None:
+            raise ValueError("dijkstra requires numeric edge elements")
+        src = self._index.get(request.get("source"))
+        if src is None:
+            raise ValueError(f"unknown source {request.get('source')!r}")
+
+        distance = await self._search(op, src)
+        targets = request.get("targets")
+        if targets is None:
+            labels = self._labels
+            return [[labels[i], d] for i, d in enumerate(distance) if d is not None]
+        index = self._index
+        return [distance[index[x]] if x in index else None for x in targets]
+
+    async def _search(self, op: str, src: int):
+        key = (op, src)
+        future = self._inflight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            if self._executor is None:
+                future = loop.run_in_executor(None, _search, op, src, self._graph)
+            else:
+                future = loop.run_in_executor(self._executor, _search, op, src)
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+            self._stats["computations"] += 1
+        else:
+            self._stats["coalesced"] += 1
+        # a cancelled waiter must not cancel the search shared with the others
+        return await asyncio.shield(future)
+
+
+class GraphClient:
+    """Client of a GraphServer, requests may be sent concurrently over one connection
+
+    Do not use constructor, use instead GraphClient.connect(host, port) or
+    GraphClient.connect_unix(path). Error responses raise ValueError
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._lock = asyncio.Lock()
+        self._pending: dict[int, asyncio.Future] = {}
+        self._next_id = 0
+        self._receiver = asyncio.create_task(self._receive())
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=0):
+        return cls(*await asyncio.open_connection(host, port))
+
+    @classmethod
+    async def connect_unix(cls, path):
+        return cls(*await asyncio.open_unix_connection(path))
+
+    async def request(self, op: str, **params):
+        """Sends {"op": op, **params} and returns the result of the response,
+        raises ConnectionError once the server closed the connection
+        """
+        if self._receiver.done():
+            raise ConnectionError("connection to the server closed")
+        self._next_id += 1
+        request_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        async with self._lock:
+            self._writer.write(_frame({"id": request_id, "op": op, **params}))
+            await self._writer.drain()
+        if self._receiver.done():
+            # the receiver may have failed the pending futures before this one
+            self._pending.pop(request_id, None)
+            if not future.done():
+                raise ConnectionError("connection to the server closed")
+        return await future
+
+    async def dijkstra(self, source, targets=None):
+        """Returns the weighted distances from source, see the module docstring"""
+        if targets is None:
+            return dict(map(tuple, await self.request("dijkstra", source=source)))
+        return await self.request("dijkstra", source=source, targets=list(targets))
+
+    async def bfs(self, source, targets=None):
+        """Returns the number of edges from source, see the module docstring"""
+        if targets is None:
+            return dict(map(tuple, await self.request("bfs", source=source)))
+        return await self.request("bfs", source=source, targets=list(targets))
+
+    async def _receive(self):
+        try:
+            while True:
+                response = json.loads(await _read_frame(self._reader, float("inf")))
+                future = self._pending.pop(response.get("id"), None)
+                if future is None or future.done():
+                    continue
+                if "error" in response:
+                    future.set_exception(ValueError(response["error"]))
+                else:
+                    future.set_result(response["result"])
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("connection to the server closed"))
+            self._pending.clear()
+
+    async def close(self):
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+        await self._receiver
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+async def _serve(args):
+    G, _ = Graph.load_edgelist(
+        args.path, args.directed, args.weighted, label_type=int if args.int_labels else str
+    )
+    async with GraphServer(G, args.workers, args.max_pending) as server:
+        if args.unix:
+            await server.start_unix(args.unix)
+        else:
+            await server.start(args.host, args.port)
+        print(f"serving {G.vertex_count()} vertices on {server.address()}", flush=True)
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="edge list with one 'u v [x]' edge per line")
+    parser.add_argument("--directed", action="store_true")
+    parser.add_argument("--weighted", action="store_true")
+    parser.add_argument("--int-labels", action="store_true", help="parse labels as integers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7878)
+    parser.add_argument("--unix", help="listen on this Unix socket path instead")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-pending", type=int, default=64)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""BFS and Dijkstra over a Partition with one worker process per shard
+
+Each worker holds only its Shard and the distances of the vertices it owns.
+The coordinator runs the search in rounds: it sends every shard the
+messages addressed to it, the shards work in parallel and answer with the
+messages for other shards, grouped by owner, until no messages are left.
+Only vertices reached through cut edges cross process boundaries, so a
+partition with a smaller edge cut exchanges less
+"""
+
+import heapq
+import multiprocessing
+from graph import Graph
+from partition import Partition, Shard
+
+
+def _bfs_level(shard: Shard, distance: list, sent: dict, level: int, frontier, outbox: dict):
+    """Sets the level of the unvisited vertices of frontier and returns the
+    ones of this shard next level, adding the others to outbox by owner
+    """
+    local, offsets, targets, owners = shard.local, shard.offsets, shard.targets, shard.owners
+    me = shard.number
+    inf = float("inf")
+    reached = []
+    for v in frontier:
+        i = local[v]
+        if distance[i] == inf:
+            distance[i] = level
+            reached.append(i)
+
+    next_frontier = []
+    for i in reached:
+        for pos in range(offsets[i], offsets[i + 1]):
+            t = targets[pos]
+            if owners[pos] == me:
+                if distance[local[t]] == inf:
+                    next_frontier.append(t)
+            elif t not in sent:
+                # sending t again at a later level cannot lower its level
+                sent[t] = level + 1
+                outbox.setdefault(owners[pos], []).append(t)
+    return next_frontier
+
+
+def _dijkstra_round(shard: Shard, distance: list, sent: dict, updates, outbox: dict):
+    """Runs Dijkstra inside the shard from the (vertex, distance) updates that
+    improve a distance, adding improved distances of remote vertices to outbox
+    """
+    local, offsets, targets = shard.local, shard.offsets, shard.targets
+    weights, owners, me = shard.weights, shard.owners, shard.number
+    inf = float("inf")
+    pq = []
+    for v, d in updates:
+        i = local[v]
+        if d < distance[i]:
+            distance[i] = d
+            heapq.heappush(pq, (d, i))
+
+    while pq:
+        d, i = heapq.heappop(pq)
+        if d > distance[i]:
+            continue
+        for pos in range(offsets[i], offsets[i + 1]):
+            t = targets[pos]
+            nd = d + weights[pos]
+            if owners[pos] == me:
+                j = local[t]
+                if nd < distance[j]:
+                    distance[j] = nd
+                    heapq.heappush(pq, (nd, j))
+            elif nd < sent.get(t, inf):
+                # only send distances better than the last one sent
+                sent[t] = nd
+                outbox.setdefault(owners[pos], {})[t] = nd
+
+
+def _shard_worker(shard: Shard, conn):
+    inf = float("inf")
+    distance: list = []
+    sent: dict[int, float] = {}
+    pending: list[int] = []
+    while True:
+        op, *args = conn.recv()
+        if op == "stop":
+            return
+        if op == "reset":
+            distance = [inf] * len(shard)
+            sent = {}
+            pending = []
+        elif op == "bfs":
+            level, frontier = args
+            outbox: dict = {}
+            pending = _bfs_level(shard, distance, sent, level, pending + frontier, outbox)
+            conn.send((outbox, len(pending)))
+        elif op == "dijkstra":
+            (updates,) = args
+            outbox = {}
+            _dijkstra_round(shard, distance, sent, updates, outbox)
+            conn.send(({o: list(vs.items()) for o, vs in outbox.items()}, 0))
+        elif op == "distances":
+            conn.send(distance)
+
+
+class ShardedGraph:
+    """Runs bfs and dijkstra over the shards of a Partition in worker processes
+
+    Starts one process per shard, which keeps its shard across queries;
+    close() stops them, or use the object as a context manager. After every
+    query rounds() and messages() give the number of rounds and of vertices
+    exchanged between shards
+    """
+
+    def __init__(self, P: Partition):
+        self._partition = P
+        self._connections = []
+        self._processes = []
+        for shard in P.shards():
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_shard_worker, args=(shard, child), daemon=True
+            )
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+        self._rounds = 0
+        self._messages = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Stops the worker processes"""
+        for conn in self._connections:
+            conn.send(("stop",))
+            conn.close()
+        for process in self._processes:
+            process.join()
+        self._connections = []
+        self._processes = []
+
+    def rounds(self):
+        """Returns the number of rounds of the last query"""
+        return self._rounds
+
+    def messages(self):
+        """Returns the number of vertices exchanged between shards by the last query"""
+        return self._messages
+
+    def _run(self, op: str, s: Graph.Vertex, first, indexed: bool):
+        P = self._partition
+        connections = self._connections
+        for conn in connections:
+            conn.send(("reset",))
+        inbox: list[list] = [[] for _ in connections]
+        inbox[P.owner(s)] = [first]
+        active = [False] * len(connections)
+        self._rounds = 0
+        self._messages = 0
+
+        while any(inbox) or any(active):
+            # every shard with messages or work left runs this round in parallel
+            running = [i for i, conn in enumerate(connections) if inbox[i] or active[i]]
+            for i in running:
+                if op == "bfs":
+                    connections[i].send((op, self._rounds, inbox[i]))
+                else:
+                    connections[i].send((op, inbox[i]))
+            inbox = [[] for _ in connections]
+            for i in running:
+                outbox, left = connections[i].recv()
+                active[i] = left > 0
+                for o, messages in outbox.items():
+                    inbox[o].extend(messages)
+                    self._messages += len(messages)
+            self._rounds += 1
+
+        distance = [float("inf")] * len(P.vertices())
+        for conn, shard in zip(connections, P.shards()):
+            conn.send(("distances",))
+            for v, d in zip(shard.vertices, conn.recv()):
+                distance[v] = d
+        if indexed:
+            return distance
+        return {v: distance[i] for i, v in enumerate(P.vertices())}
+
+    def bfs(self, s: Graph.Vertex, indexed=False):
+        """Returns a map with the number of edges from s to every vertex
+
+        Level synchronous, one round per level. With indexed=True returns
+        instead the list of levels indexed by Vertex.index(), inf if unreached
+        """
+        return self._run("bfs", s, s._index, indexed)
+
+    def dijkstra(self, s: Graph.Vertex, indexed=False):
+        """Returns a map with the distance from s to every vertex, as dijkstra(G, s)
+
+        Every round each shard runs Dijkstra over its own vertices from the
+        distances it received and sends the improved distances of remote
+        vertices, so the rounds follow the cut edges on the shortest paths.
+        With indexed=True returns instead the list of distances indexed by
+        Vertex.index()
+        """
+        if self._partition.shards()[0].weights is None:
+            raise ValueError("dijkstra requires numeric edge elements")
+        return self._run("dijkstra", s, (s._index, 0), indexed)
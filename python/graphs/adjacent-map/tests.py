@@ -1,10 +1,43 @@
 from functools import reduce
+import asyncio
+import os
+import random
+import socket
+import tempfile
 import unittest
 from graph import Graph
-from dijkstra import dijkstra
+from compact_graph import CompactGraph
+from transitive_closure import TransitiveClosure
+from reachability import ReachabilityIndex
+from priority_queue import IndexedHeap, BucketQueue
+from dijkstra import (
+    dijkstra,
+    dijkstra_compact,
+    dijkstra_many,
+    distance_matrix,
+    shortest_path,
+    bidirectional_shortest_path,
+)
 import dfs
 import bfs
-from topological_sorting import topological_sorting
+import benchmarks
+import generators
+from instrumentation import TraversalStats
+from server import GraphServer, GraphClient
+from partition import hash_partition, bfs_partition, label_propagation_partition
+from sharded import ShardedGraph
+from topological_sorting import (
+    topological_sorting,
+    topological_sorting_compact,
+    topological_levels,
+    TaskScheduler,
+)
+
+try:
+    import numpy
+    import all_pairs
+except ImportError:
+    numpy = None
 
 
 class TestGraphSetup(unittest.TestCase):
@@ -44,11 +77,124 @@ class TestGraphSetup(unittest.TestCase):
         self.assertIsNotNone(edge)
         self.assertEqual(edge.endpoints(), (self.vA, self.vB))
 
+    def test_edges_view(self):
+        """Test edges() is a live view of the inserted edges"""
+        edges = self.G.edges()
+        self.assertEqual(len(edges), 8)
+        self.assertIn(self.G.get_edge(self.vF, self.vG), edges)
+        vH = self.G.insert_vertex("H")
+        e = self.G.insert_edge(self.vG, vH)
+        self.assertIn(e, edges)
+        self.assertEqual(self.G.edge_count(), 9)
+
+    def test_insert_edge_replaces(self):
+        """Test inserting an existing edge replaces it instead of counting twice"""
+        old = self.G.get_edge(self.vA, self.vB)
+        new = self.G.insert_edge(self.vB, self.vA, 3)
+        self.assertEqual(self.G.edge_count(), 8)
+        self.assertNotIn(old, self.G.edges())
+        self.assertIs(self.G.get_edge(self.vA, self.vB), new)
+
+    def test_remove_edge(self):
+        """Test removing an undirected edge from both endpoints"""
+        e = self.G.get_edge(self.vB, self.vC)
+        self.G.remove_edge(e)
+        self.assertIsNone(self.G.get_edge(self.vB, self.vC))
+        self.assertIsNone(self.G.get_edge(self.vC, self.vB))
+        self.assertEqual(self.G.edge_count(), 7)
+        self.assertNotIn(e, self.G.edges())
+
+    def test_remove_vertex(self):
+        """Test removing a vertex drops its edges and keeps indices dense"""
+        self.G.remove_vertex(self.vC)
+        self.assertEqual(self.G.vertex_count(), 6)
+        self.assertEqual(self.G.edge_count(), 4)
+        self.assertIsNone(self.G.get_edge(self.vA, self.vC))
+        self.assertEqual(self.vG.index(), 2)
+        self.assertIs(self.G.vertex(2), self.vG)
+        self.assertEqual(len(bfs.bfs_queue(self.G, self.vA)), 5)
+
+    def test_remove_vertex_directed(self):
+        """Test removing a vertex updates incoming and outgoing maps"""
+        G = Graph(True)
+        vA = G.insert_vertex("A")
+        vB = G.insert_vertex("B")
+        vC = G.insert_vertex("C")
+        G.insert_edge(vA, vB)
+        G.insert_edge(vB, vC)
+        G.insert_edge(vB, vB)
+        G.remove_vertex(vB)
+        self.assertEqual(G.edge_count(), 0)
+        self.assertEqual(G.degree(vC, False), 0)
+        self.assertEqual(topological_sorting(G), [vA, vC])
+
+    def test_vertex_index(self):
+        """Test vertices get dense indices in insertion order"""
+        self.assertEqual(self.vA.index(), 0)
+        self.assertEqual(self.vG.index(), 6)
+        self.assertIs(self.G.vertex(self.vD.index()), self.vD)
+
     def test_get_edge_nonexistent(self):
         """Test retrieving nonexistent edge returns None"""
         edge = self.G.get_edge(self.vD, self.vG)
         self.assertIsNone(edge)
 
+    def test_degree(self):
+        """Test outgoing and incoming degrees of a directed graph"""
+        G = Graph(True)
+        vA = G.insert_vertex("A")
+        vB = G.insert_vertex("B")
+        vC = G.insert_vertex("C")
+        G.insert_edge(vA, vB)
+        G.insert_edge(vA, vC)
+        G.insert_edge(vC, vB)
+        self.assertEqual(G.degree(vA), 2)
+        self.assertEqual(G.degree(vB), 0)
+        self.assertEqual(G.degree(vB, False), 2)
+
+    def test_to_matrix(self):
+        """Test the dense matrix holds edge elements, 1 for None and missing otherwise"""
+        G, v = Graph.from_edges([(0, 1, 7), (0, 2, 9), (2, 1, None)], directed=True, weighted=True)
+        matrix = G.to_matrix()
+        self.assertEqual(list(matrix[0]), [float("inf"), 7, 9])
+        self.assertEqual(matrix[2][1], 1)
+        self.assertEqual(matrix[1][0], float("inf"))
+        self.assertEqual(G.to_matrix(missing=0)[1][0], 0)
+
+
+class TestBulkLoading(unittest.TestCase):
+    """Test building graphs from edge lists"""
+
+    def test_from_edges(self):
+        """Test labels are interned into one vertex each"""
+        G, vertices = Graph.from_edges([("A", "B"), ("B", "C"), ("A", "C")])
+        self.assertEqual(G.vertex_count(), 3)
+        self.assertEqual(G.edge_count(), 3)
+        self.assertIsNotNone(G.get_edge(vertices["C"], vertices["B"]))
+        self.assertEqual(vertices["A"].element(), "A")
+
+    def test_from_edges_directed_weighted(self):
+        """Test directed weighted edges keep their elements"""
+        G, vertices = Graph.from_edges([(1, 2, 5), (2, 3, 7)], directed=True, weighted=True)
+        self.assertTrue(G.is_directed())
+        self.assertEqual(G.get_edge(vertices[1], vertices[2]).element(), 5)
+        self.assertIsNone(G.get_edge(vertices[2], vertices[1]))
+        self.assertEqual(dijkstra(G, vertices[1])[vertices[3]], 12)
+
+    def test_load_edgelist(self):
+        """Test loading a CSV edge list in small chunks"""
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as f:
+            f.write("# u,v,w\n1,2,0.5\n\n2,3,1.5\n3,1,2\n")
+        try:
+            G, vertices = Graph.load_edgelist(
+                f.name, True, True, ",", label_type=int, chunk_size=8
+            )
+        finally:
+            os.remove(f.name)
+        self.assertEqual(G.vertex_count(), 3)
+        self.assertEqual(G.edge_count(), 3)
+        self.assertEqual(G.get_edge(vertices[3], vertices[1]).element(), 2.0)
+
 
 class TestDFSRecursive(unittest.TestCase):
     """Test recursive DFS implementation"""
@@ -123,12 +269,28 @@ class TestDFSStack(unittest.TestCase):
         self.assertIn(self.vC, discovered)
         self.assertIn(self.vD, discovered)
 
+    def test_dfs_stack_indexed(self):
+        """Test indexed DFS leaves undiscovered vertices as None"""
+        parent = dfs.dfs_stack(self.G, self.vB, indexed=True)
+        self.assertIs(parent[self.vD.index()], self.G.get_edge(self.vB, self.vD))
+        self.assertIs(parent[self.vA.index()], self.G.get_edge(self.vA, self.vB))
+
     def test_dfs_stack_returns_dict(self):
         """Test that DFS stack returns dictionary with None for start vertex"""
         discovered = dfs.dfs_stack(self.G, self.vA)
         self.assertIsNone(discovered[self.vA])
         self.assertIsNotNone(discovered[self.vB])
 
+    def test_dfs_iter(self):
+        """Test lazy DFS yields preorder with tree depths and stops early"""
+        result = [(v, d) for v, _, d in dfs.dfs_iter(self.G, self.vA)]
+        self.assertEqual(result, [(self.vA, 0), (self.vB, 1), (self.vD, 2), (self.vC, 1)])
+        result = [v for v, _, _ in dfs.dfs_iter(self.G, self.vA, max_depth=1)]
+        self.assertEqual(result, [self.vA, self.vB, self.vC])
+        self.assertEqual(len(list(dfs.dfs_iter(self.G, self.vA, max_vertices=1))), 1)
+        result = [v for v, _, _ in dfs.dfs_iter(self.G, self.vA, until=lambda v: v is self.vD)]
+        self.assertEqual(result, [self.vA, self.vB, self.vD])
+
 
 class TestDFSPath(unittest.TestCase):
     """Test path construction with DFS"""
@@ -256,6 +418,43 @@ class TestDFSComplete(unittest.TestCase):
         self.assertIsNone(forest[vC])
 
 
+class TestComponentTracker(unittest.TestCase):
+    """Test union-find connectivity kept up to date by insert_edge"""
+
+    def test_incremental_components(self):
+        """Test unions happen as vertices and edges are inserted"""
+        G = Graph()
+        v = [G.insert_vertex(i) for i in range(4)]
+        components = G.track_components()
+        self.assertEqual(components.component_count(), 4)
+        G.insert_edge(v[0], v[1])
+        G.insert_edge(v[2], v[3])
+        self.assertTrue(components.connected(v[1], v[0]))
+        self.assertFalse(components.connected(v[1], v[2]))
+        self.assertEqual(components.component_count(), 2)
+        v.append(G.insert_vertex(4))
+        G.insert_edge(v[1], v[2])
+        self.assertEqual(components.component_count(), 2)
+        self.assertIs(components.component_of(v[0]), components.component_of(v[3]))
+        self.assertIs(components.component_of(v[4]), v[4])
+
+    def test_removal_rebuilds(self):
+        """Test removals and bulk loads are picked up by the next query"""
+        G, v = Graph.from_edges([(0, 1), (1, 2), (3, 4)])
+        components = G.track_components()
+        self.assertEqual(components.component_count(), 2)
+        G.remove_edge(G.get_edge(v[1], v[2]))
+        self.assertFalse(components.connected(v[0], v[2]))
+        G.remove_vertex(v[0])
+        self.assertEqual(components.component_count(), 3)
+        G._bulk_insert([(2, 3)], v)
+        self.assertTrue(components.connected(v[2], v[4]))
+
+    def test_directed_rejected(self):
+        """Test directed graphs can not be tracked"""
+        self.assertRaises(ValueError, Graph(True).track_components)
+
+
 class TestDFSCycle(unittest.TestCase):
     """Test cycle detection with DFS"""
 
@@ -290,6 +489,71 @@ class TestDFSCycle(unittest.TestCase):
 
         self.assertTrue(dfs.dfs_has_cycle(G, v))
 
+    def test_directed_cross_edge_is_not_cycle(self):
+        """Test an edge into a finished branch is not a cycle"""
+        G = Graph(True)
+        vA = G.insert_vertex("A")
+        vB = G.insert_vertex("B")
+        vC = G.insert_vertex("C")
+        G.insert_edge(vA, vB)
+        G.insert_edge(vA, vC)
+        G.insert_edge(vC, vB)
+        G.insert_edge(vB, vC)
+        self.assertTrue(dfs.dfs_has_cycle(G, vA))
+        G.remove_edge(G.get_edge(vB, vC))
+        self.assertFalse(dfs.dfs_has_cycle(G, vA))
+
+
+class TestDFSEvents(unittest.TestCase):
+    """Test the iterative DFS engine"""
+
+    def test_event_order(self):
+        """Test events follow the recursive DFS order"""
+        G = Graph(True)
+        vA = G.insert_vertex("A")
+        vB = G.insert_vertex("B")
+        vC = G.insert_vertex("C")
+        eAB = G.insert_edge(vA, vB)
+        eBA = G.insert_edge(vB, vA)
+        eAC = G.insert_edge(vA, vC)
+        eBC = G.insert_edge(vB, vC)
+
+        events = list(dfs.dfs_events(G, [vA]))
+        self.assertEqual(
+            events,
+            [
+                (dfs.DISCOVER, vA, None),
+                (dfs.TREE_EDGE, vB, eAB),
+                (dfs.DISCOVER, vB, eAB),
+                (dfs.BACK_EDGE, vA, eBA),
+                (dfs.TREE_EDGE, vC, eBC),
+                (dfs.DISCOVER, vC, eBC),
+                (dfs.FINISH, vC, eBC),
+                (dfs.FINISH, vB, eAB),
+                (dfs.OTHER_EDGE, vC, eAC),
+                (dfs.FINISH, vA, None),
+            ],
+        )
+
+    def test_incoming_edges(self):
+        """Test outgoing=False is followed past the first level"""
+        G = Graph(True)
+        v = [G.insert_vertex(i) for i in range(3)]
+        G.insert_edge(v[0], v[1])
+        G.insert_edge(v[1], v[2])
+        discovered = {v[2]: None}
+        dfs.dfs(G, v[2], discovered, False)
+        self.assertEqual(set(discovered), set(v))
+
+    def test_long_path(self):
+        """Test paths longer than the recursion limit"""
+        G, vertices = Graph.from_edges((i, i + 1) for i in range(100000))
+        discovered = {vertices[0]: None}
+        dfs.dfs(G, vertices[0], discovered)
+        self.assertEqual(len(discovered), 100001)
+        self.assertFalse(dfs.dfs_has_cycle(G, vertices[0]))
+        self.assertEqual(len(dfs.construct_path(vertices[0], vertices[100000], discovered)), 100001)
+
 
 class TestBFS(unittest.TestCase):
     """Test BFS implementation"""
@@ -330,6 +594,57 @@ class TestBFS(unittest.TestCase):
         self.assertIsNotNone(discovered[self.vD])
         self.assertIsNotNone(discovered[self.vE])
 
+    def test_bfs_direction_optimizing(self):
+        """Test switching directions gives the same levels as BFS"""
+        for directed in (False, True):
+            rng = random.Random(7)
+            G = Graph(directed)
+            v = [G.insert_vertex(i) for i in range(200)]
+            for i in range(1, 200):
+                # random recursive graph, low diameter like the scale-free ones
+                G.insert_edge(v[i], v[rng.randrange(i)])
+                G.insert_edge(v[rng.randrange(i)], v[i])
+
+            expected = {v[0]: None}
+            bfs.bfs(G, v[0], expected)
+            # a tiny alpha stays top-down while edges are left, a huge alpha
+            # and beta go bottom-up at once and never back
+            top_down = bfs.bfs_direction_optimizing(G, v[0], {v[0]: None}, 1e-9)
+            for alpha, beta in ((14, 24), (float("inf"), float("inf"))):
+                discovered = {v[0]: None}
+                levels = bfs.bfs_direction_optimizing(G, v[0], discovered, alpha, beta)
+                self.assertEqual(discovered.keys(), expected.keys())
+                self.assertEqual([set(l) for l in levels], [set(l) for l in top_down])
+                depth = {u: d for d, level in enumerate(levels) for u in level}
+                for u, e in discovered.items():
+                    if e is not None:
+                        self.assertIn(u, e.endpoints())
+                        self.assertEqual(depth[e.opposite(u)], depth[u] - 1)
+
+    def test_bfs_direction_optimizing_scans_fewer_edges(self):
+        """Test bottom-up steps run on a dense graph and scan fewer edges"""
+        G = generators.erdos_renyi(1000, 16000, seed=8)
+        s = G.vertex(0)
+        top_down = TraversalStats()
+        bfs.bfs_direction_optimizing(G, s, {s: None}, 1e-9, stats=top_down)
+        hybrid = TraversalStats()
+        bfs.bfs_direction_optimizing(G, s, {s: None}, stats=hybrid)
+        self.assertIn("bottom_up", hybrid.phases)
+        self.assertEqual(hybrid.vertices_settled, top_down.vertices_settled)
+        self.assertLess(2 * hybrid.edges_scanned, top_down.edges_scanned)
+
+    def test_bfs_iter(self):
+        """Test lazy BFS yields depths and stops early"""
+        result = list(bfs.bfs_iter(self.G, self.vA))
+        self.assertEqual([(v, d) for v, _, d in result],
+                         [(self.vA, 0), (self.vB, 1), (self.vC, 1), (self.vD, 2), (self.vE, 2)])
+        self.assertIs(result[3][1], self.G.get_edge(self.vB, self.vD))
+        self.assertEqual(len(list(bfs.bfs_iter(self.G, self.vA, max_depth=1))), 3)
+        self.assertEqual(len(list(bfs.bfs_iter(self.G, self.vA, max_vertices=2))), 2)
+        found = list(bfs.bfs_iter(self.G, self.vA, until=lambda v: v.element() == "C"))
+        self.assertEqual(found[-1][0], self.vC)
+        self.assertEqual(len(found), 3)
+
 
 class TestBFSQueue(unittest.TestCase):
     """Test BFS using queue"""
@@ -364,6 +679,13 @@ class TestBFSQueue(unittest.TestCase):
         self.assertIsNone(discovered[self.vA])
         self.assertIsNotNone(discovered[self.vB])
 
+    def test_bfs_queue_indexed(self):
+        """Test indexed BFS returns discovery edges by vertex index"""
+        parent = bfs.bfs_queue(self.G, self.vA, indexed=True)
+        self.assertIsNone(parent[self.vA.index()])
+        self.assertIs(parent[self.vE.index()], self.G.get_edge(self.vC, self.vE))
+        self.assertEqual(len(parent), self.G.vertex_count())
+
     def test_bfs_queue_single_vertex(self):
         """Test BFS queue on single vertex"""
         G = Graph()
@@ -483,6 +805,75 @@ class TestFloydWarshall(unittest.TestCase):
         self.assertIsNotNone(closure.get_edge(c1, c3))
         self.assertIsNotNone(closure.get_edge(c1, c4))
 
+
+class TestTransitiveClosure(unittest.TestCase):
+    """Test bit row reachability queries"""
+
+    def test_reachable(self):
+        """Test reachability through a cycle and into a sink"""
+        G = Graph(True)
+        v = [G.insert_vertex(i) for i in range(5)]
+        G.insert_edge(v[0], v[1])
+        G.insert_edge(v[1], v[2])
+        G.insert_edge(v[2], v[1])
+        G.insert_edge(v[2], v[3])
+
+        closure = TransitiveClosure(G)
+        self.assertTrue(closure.reachable(v[0], v[3]))
+        self.assertTrue(closure.reachable(v[2], v[1]))
+        self.assertTrue(closure.reachable(v[4], v[4]))
+        self.assertFalse(closure.reachable(v[3], v[0]))
+        self.assertFalse(closure.reachable(v[0], v[4]))
+        self.assertEqual(set(closure.descendants(v[1])), {v[1], v[2], v[3]})
+
+    def test_reachability_index_matches_closure(self):
+        """Test the index answers like the closure on random graphs"""
+        rng = random.Random(3)
+        for directed in (True, False):
+            G = Graph(directed)
+            v = [G.insert_vertex(i) for i in range(40)]
+            for _ in range(60):
+                a, b = rng.randrange(40), rng.randrange(40)
+                # mostly forward edges, so the graph is close to a DAG
+                if rng.random() < 0.9:
+                    a, b = min(a, b), max(a, b)
+                G.insert_edge(v[a], v[b])
+            closure = TransitiveClosure(G)
+            index = ReachabilityIndex(G, labelings=3)
+            for a in v:
+                for b in v:
+                    self.assertEqual(index.reachable(a, b), closure.reachable(a, b))
+
+    def test_strongly_connected_components(self):
+        """Test components are numbered in reverse topological order"""
+        G = Graph(True)
+        v = [G.insert_vertex(i) for i in range(4)]
+        G.insert_edge(v[0], v[1])
+        G.insert_edge(v[1], v[0])
+        G.insert_edge(v[1], v[2])
+        G.insert_edge(v[3], v[2])
+
+        comp, count = dfs.strongly_connected_components(G)
+        self.assertEqual(count, 3)
+        self.assertEqual(comp[0], comp[1])
+        self.assertLess(comp[2], comp[1])
+        self.assertLess(comp[2], comp[3])
+
+        dag, comp = dfs.condensation(G)
+        self.assertEqual(dag.vertex_count(), 3)
+        self.assertEqual(dag.edge_count(), 2)
+        self.assertEqual(dag.vertex(comp[0]).element(), [v[0], v[1]])
+        self.assertEqual(topological_sorting(dag)[-1], dag.vertex(comp[2]))
+
+    def test_strongly_connected_long_cycle(self):
+        """Test a cycle longer than the recursion limit is one component"""
+        n = 50000
+        G, vertices = Graph.from_edges(((i, (i + 1) % n) for i in range(n)), directed=True)
+        self.assertEqual(dfs.strongly_connected_components(G)[1], 1)
+        self.assertTrue(dfs.test_connectivity(G, vertices[0]))
+        G.remove_edge(G.get_edge(vertices[n - 1], vertices[0]))
+        self.assertEqual(dfs.strongly_connected_components(G)[1], n)
+
 class TestTopologicalSort(unittest.TestCase):
 
     def test_topological_sort_simple_path(self):
@@ -567,6 +958,98 @@ class TestTopologicalSort(unittest.TestCase):
 
         self.assertNotEqual(G.vertex_count(), len(topological_sorting(G)))
 
+    def test_topological_levels(self):
+        G, v = Graph.from_edges(
+            [("A", "C"), ("A", "D"), ("B", "D"), ("C", "D"), ("D", "E"), ("C", "E")],
+            directed=True,
+        )
+        levels = [set(u.element() for u in level) for level in topological_levels(G)]
+        self.assertEqual(levels, [{"A", "B"}, {"C"}, {"D"}, {"E"}])
+
+    def test_task_scheduler(self):
+        G, v = Graph.from_edges(
+            [("A", "C", 1), ("C", "E", 1), ("B", "D", 5), ("D", "E", 1), ("F", "E", 1)],
+            directed=True,
+            weighted=True,
+        )
+        scheduler = TaskScheduler(G, critical_path=True)
+        self.assertEqual(scheduler.priority(v["B"]), 6)
+        self.assertEqual(scheduler.start(), [v["B"], v["A"], v["F"]])
+        self.assertEqual(scheduler.done(v["A"]), [v["C"]])
+        self.assertEqual(scheduler.done(v["C"]), [])
+        self.assertEqual(scheduler.done(v["F"]), [])
+        self.assertEqual(scheduler.done(v["B"]), [v["D"]])
+        self.assertEqual(scheduler.done(v["D"]), [v["E"]])
+        self.assertFalse(scheduler.is_finished())
+        scheduler.done(v["E"])
+        self.assertTrue(scheduler.is_finished())
+
+    def test_task_scheduler_rejects_misuse(self):
+        G, v = Graph.from_edges([("A", "B"), ("B", "C")], directed=True)
+        scheduler = TaskScheduler(G, critical_path=True)
+        self.assertEqual(scheduler.priority(v["A"]), 2)
+        self.assertRaises(ValueError, scheduler.done, v["A"])
+        self.assertEqual(scheduler.start(), [v["A"]])
+        self.assertRaises(ValueError, scheduler.done, v["B"])
+        self.assertEqual(scheduler.done(v["A"]), [v["B"]])
+        self.assertRaises(ValueError, scheduler.done, v["A"])
+        # A is done and B was handed out by done, start must not return them
+        self.assertEqual(scheduler.start(), [])
+        self.assertEqual(scheduler.remaining(), 2)
+
+        G.insert_edge(v["C"], v["B"])
+        self.assertRaises(ValueError, TaskScheduler, G)
+
+
+class TestTopologicalOrder(unittest.TestCase):
+
+    @staticmethod
+    def is_topological(G, order):
+        position = {v: i for i, v in enumerate(order)}
+        return len(order) == G.vertex_count() and all(
+            position[u] < position[v] for u, v in (e.endpoints() for e in G.edges())
+        )
+
+    def test_reorders_on_insertion(self):
+        G = Graph(True)
+        v = [G.insert_vertex(i) for i in range(5)]
+        order = G.track_topological_order()
+        G.insert_edge(v[3], v[1])
+        G.insert_edge(v[4], v[3])
+        G.insert_edge(v[1], v[0])
+        G.insert_edge(v[2], v[4])
+        self.assertEqual(order.order(), [v[2], v[4], v[3], v[1], v[0]])
+        self.assertLess(order.position(v[4]), order.position(v[0]))
+
+    def test_rejects_cycles(self):
+        G = Graph(True)
+        v = [G.insert_vertex(i) for i in range(3)]
+        order = G.track_topological_order()
+        G.insert_edge(v[0], v[1])
+        G.insert_edge(v[1], v[2])
+        self.assertRaises(ValueError, G.insert_edge, v[2], v[0])
+        self.assertRaises(ValueError, G.insert_edge, v[1], v[1])
+        self.assertIsNone(G.get_edge(v[2], v[0]))
+        self.assertEqual(G.edge_count(), 2)
+        self.assertEqual(order.order(), v)
+
+    def test_random_insertions(self):
+        rng = random.Random(5)
+        G = Graph(True)
+        v = [G.insert_vertex(i) for i in range(30)]
+        order = G.track_topological_order()
+        rank = list(range(30))
+        rng.shuffle(rank)
+        for _ in range(200):
+            a, b = rng.randrange(30), rng.randrange(30)
+            if rank[a] < rank[b]:
+                G.insert_edge(v[a], v[b])
+            self.assertTrue(self.is_topological(G, order.order()))
+        G.remove_vertex(v[0])
+        G.insert_edge(G.insert_vertex(30), v[1])
+        self.assertTrue(self.is_topological(G, order.order()))
+
+
 class Dijkstra(unittest.TestCase):
     def test_dijkstr(self):
         G = Graph()
@@ -607,5 +1090,581 @@ class Dijkstra(unittest.TestCase):
         self.assertEqual(distance[v8],5)
         self.assertEqual(distance[v9],6)
 
+        indexed = dijkstra(G, v1, indexed=True)
+        self.assertEqual(indexed, [distance[v] for v in G.vertices()])
+
+    def test_shortest_path(self):
+        G = Graph(True)
+        v = [G.insert_vertex(i) for i in range(6)]
+        G.insert_edge(v[0], v[1], 7)
+        G.insert_edge(v[0], v[2], 9)
+        G.insert_edge(v[0], v[5], 14)
+        G.insert_edge(v[1], v[2], 10)
+        G.insert_edge(v[1], v[3], 15)
+        G.insert_edge(v[2], v[3], 11)
+        G.insert_edge(v[2], v[5], 2)
+        G.insert_edge(v[5], v[4], 9)
+        G.insert_edge(v[3], v[4], 6)
+
+        for search in (shortest_path, bidirectional_shortest_path):
+            d, vertices, edges = search(G, v[0], v[4])
+            self.assertEqual(d, 20)
+            self.assertEqual(vertices, [v[0], v[2], v[5], v[4]])
+            self.assertEqual(edges, [G.get_edge(v[0], v[2]), G.get_edge(v[2], v[5]),
+                                     G.get_edge(v[5], v[4])])
+            self.assertEqual(search(G, v[3], v[3]), (0, [v[3]], []))
+            self.assertEqual(search(G, v[4], v[0]), (float("inf"), [], []))
+
+        distance = dijkstra(G, v[0])
+        self.assertEqual(dijkstra(G, v[0], queue=IndexedHeap(6)), distance)
+        self.assertEqual(dijkstra(G, v[0], queue=IndexedHeap(6, 4)), distance)
+        self.assertEqual(dijkstra(G, v[0], queue=BucketQueue(6, 15)), distance)
+        for u in v:
+            self.assertEqual(bidirectional_shortest_path(G, v[0], u)[0], distance[u])
+            self.assertEqual(shortest_path(G, v[0], u)[0], distance[u])
+
+    def test_many_sources(self):
+        G, v = Graph.from_edges(
+            [(0, 1, 7), (0, 2, 9), (1, 3, 15), (2, 3, 11), (2, 5, 2), (5, 4, 9), (3, 4, 6)],
+            directed=True,
+            weighted=True,
+        )
+        distance = dijkstra(G, v[0])
+        matrix = distance_matrix(G, workers=1)
+        self.assertEqual(list(matrix[v[0].index()]), [distance[u] for u in G.vertices()])
+        for workers in (1, 2):
+            results = list(dijkstra_many(G, [v[3], v[0]], workers, chunk_size=1))
+            self.assertEqual([s for s, _ in results], [v[3], v[0]])
+            self.assertEqual(results[1][1], distance)
+            self.assertEqual(results[0][1], dijkstra(G, v[3]))
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestFloydWarshallWeighted(unittest.TestCase):
+    """Test the NumPy all pairs shortest paths"""
+
+    def setUp(self):
+        self.G, self.v = Graph.from_edges(
+            [(0, 1, 3), (1, 2, -2), (0, 2, 4), (2, 3, 1), (3, 0, 2)],
+            directed=True,
+            weighted=True,
+        )
+        self.v[4] = self.G.insert_vertex(4)
+
+    def test_distances_match_bellman_ford(self):
+        """Test distances and paths on a graph with a negative edge"""
+        for dtype in (numpy.float64, numpy.float32):
+            distance, predecessor = all_pairs.floyd_warshall_weighted(self.G, dtype)
+            self.assertEqual(distance.dtype, dtype)
+            self.assertEqual(distance[0, 3], 2)
+            self.assertEqual(distance[3, 2], 3)
+            self.assertEqual(distance[1, 1], 0)
+            self.assertTrue(numpy.isinf(distance[0, 4]))
+            path = all_pairs.matrix_path(self.G, predecessor, self.v[0], self.v[3])
+            self.assertEqual(path, [self.v[0], self.v[1], self.v[2], self.v[3]])
+            self.assertEqual(all_pairs.matrix_path(self.G, predecessor, self.v[0], self.v[0]),
+                             [self.v[0]])
+            self.assertEqual(all_pairs.matrix_path(self.G, predecessor, self.v[4], self.v[0]), [])
+
+    def test_without_predecessors(self):
+        """Test distances are the same when predecessors are skipped"""
+        distance, predecessor = all_pairs.floyd_warshall_weighted(self.G, predecessors=False)
+        self.assertIsNone(predecessor)
+        expected, _ = all_pairs.floyd_warshall_weighted(self.G)
+        self.assertTrue(numpy.array_equal(distance, expected))
+
+    def test_negative_cycle(self):
+        """Test negative cycles are rejected"""
+        self.G.insert_edge(self.v[2], self.v[0], -5)
+        self.assertRaises(ValueError, all_pairs.floyd_warshall_weighted, self.G)
+
+
+class TestQueryCache(unittest.TestCase):
+    """Test memoized queries and their invalidation"""
+
+    def setUp(self):
+        self.G, self.v = Graph.from_edges([(1, 2, 1), (2, 3, 2), (1, 3, 5)], weighted=True)
+
+    def test_repeated_queries_hit(self):
+        """Test a repeated query returns the cached result"""
+        cache = self.G.enable_cache()
+        first = dijkstra(self.G, self.v[1])
+        self.assertIs(dijkstra(self.G, self.v[1]), first)
+        self.assertEqual(first[self.v[3]], 3)
+        bfs.bfs_queue(self.G, self.v[1])
+        info = cache.cache_info()
+        self.assertEqual((info.hits, info.misses, info.size), (1, 2, 2))
+
+    def test_changes_invalidate(self):
+        """Test changing the graph drops the cached results"""
+        cache = self.G.enable_cache()
+        dijkstra(self.G, self.v[1])
+        self.G.insert_edge(self.v[1], self.v[3], 2)
+        self.assertEqual(dijkstra(self.G, self.v[1])[self.v[3]], 2)
+        info = cache.cache_info()
+        self.assertEqual((info.hits, info.misses, info.invalidations), (0, 2, 1))
+
+    def test_eviction(self):
+        """Test least recently used results are evicted by count and cost"""
+        cache = self.G.enable_cache(maxsize=2)
+        for v in (self.v[1], self.v[2], self.v[1], self.v[3]):
+            dijkstra(self.G, v)
+        self.assertEqual(cache.cache_info().evictions, 1)
+        dijkstra(self.G, self.v[1])
+        self.assertEqual(cache.cache_info().hits, 2)
+
+        cache = self.G.enable_cache(max_cost=4)
+        dijkstra(self.G, self.v[1])
+        dijkstra(self.G, self.v[2])
+        self.assertEqual(cache.cache_info().size, 1)
+        self.assertEqual(cache.cache_info().cost, 3)
+
+    def test_queue_bypasses_cache(self):
+        """Test queries given a queue are neither cached nor answered from the cache"""
+        cache = self.G.enable_cache()
+        dijkstra(self.G, self.v[1])
+        distance = dijkstra(self.G, self.v[1], queue=IndexedHeap(3))
+        self.assertEqual(distance[self.v[3]], 3)
+        info = cache.cache_info()
+        self.assertEqual((info.hits, info.misses, info.size), (0, 1, 1))
+        self.assertRaises(TypeError, dijkstra, self.G, self.v[1], False, IndexedHeap(3))
+
+    def test_disabled(self):
+        """Test results are recomputed without a cache"""
+        self.G.disable_cache()
+        self.assertIsNot(dijkstra(self.G, self.v[1]), dijkstra(self.G, self.v[1]))
+
+
+class TestGenerators(unittest.TestCase):
+    """Test the synthetic graph families"""
+
+    def test_erdos_renyi(self):
+        """Test G(n, m) sizes, seeding and the compact form"""
+        G = generators.erdos_renyi(50, 200, seed=1)
+        self.assertEqual((G.vertex_count(), G.edge_count()), (50, 200))
+        self.assertFalse(G.is_directed())
+        H = generators.erdos_renyi(50, 200, seed=1)
+        self.assertEqual(dijkstra(G, G.vertex(0), indexed=True),
+                         dijkstra(H, H.vertex(0), indexed=True))
+        C = generators.erdos_renyi(50, 200, seed=1, compact=True)
+        self.assertEqual(C.edge_count(), 200)
+        distance = dijkstra_compact(C, C.vertex(0))
+        self.assertEqual([distance[v] for v in C.vertices()],
+                         dijkstra(G, G.vertex(0), indexed=True))
+        self.assertRaises(ValueError, generators.erdos_renyi, 3, 4)
+
+    def test_rmat(self):
+        """Test R-MAT degrees are skewed"""
+        G = generators.rmat(8, seed=2)
+        self.assertEqual(G.vertex_count(), 256)
+        self.assertTrue(G.is_directed())
+        degrees = sorted((G.degree(v) for v in G.vertices()), reverse=True)
+        self.assertGreater(degrees[0], 4 * degrees[len(degrees) // 2])
+        C = generators.rmat(8, seed=2, compact=True)
+        self.assertEqual(C.edge_count(), G.edge_count())
+        self.assertEqual(C.degree(7, False), G.degree(G.vertex(7), False))
+
+    def test_grid(self):
+        """Test grid edges join horizontal and vertical neighbours"""
+        G = generators.grid(3, 4)
+        self.assertEqual((G.vertex_count(), G.edge_count()), (12, 17))
+        self.assertIsNotNone(G.get_edge(G.vertex(5), G.vertex(1)))
+        self.assertIsNone(G.get_edge(G.vertex(3), G.vertex(4)))
+        self.assertEqual(generators.grid(3, 4, diagonals=True).edge_count(), 29)
+
+    def test_random_dag(self):
+        """Test random DAGs are acyclic"""
+        G = generators.random_dag(100, 400, seed=3)
+        self.assertEqual(G.edge_count(), 400)
+        self.assertEqual(len(topological_sorting(G)), 100)
+        C = generators.random_dag(100, 400, seed=3, compact=True)
+        self.assertEqual(len(topological_sorting_compact(C)), 100)
+
+
+class TestBenchmarks(unittest.TestCase):
+    """Test the benchmark harness on tiny graphs"""
+
+    def test_run_and_compare(self):
+        """Test results cover the cases and slower ones are reported"""
+        cases = benchmarks.run(sizes=(16,), densities=(2,), repeat=1)
+        self.assertIn("dijkstra/grid/n=16/d=2", cases)
+        self.assertIn("topological_sorting/dag/n=16/d=2", cases)
+        self.assertNotIn("topological_sorting/grid/n=16/d=2", cases)
+        result = cases["bfs_queue/erdos_renyi/n=16/d=2"]
+        self.assertEqual(result["edges"], 32)
+        self.assertGreater(result["peak_bytes"], 0)
+        self.assertGreater(result["allocated_blocks"], 0)
+
+        baseline = {name: dict(r, seconds=r["seconds"] / 2) for name, r in cases.items()}
+        self.assertEqual(benchmarks.regressions(cases, cases), [])
+        self.assertEqual(len(benchmarks.regressions(cases, baseline, 0.5)), len(cases))
+
+    def test_allocated_blocks_grow_with_size(self):
+        """Test the allocated blocks count the result of the run"""
+        blocks = []
+        for n in (10, 40):
+            G = generators.grid(n, n, seed=1)
+            blocks.append(benchmarks.measure(dijkstra, G, G.vertex(0), repeat=1)[2])
+        # one float distance per reached vertex
+        self.assertGreaterEqual(blocks[0], 100)
+        self.assertGreaterEqual(blocks[1] - blocks[0], 1600 - 100)
+
+
+class TestInstrumentation(unittest.TestCase):
+    """Test the counters and timings filled in by traversals"""
+
+    def setUp(self):
+        self.G, self.v = Graph.from_edges(
+            [(1, 2, 1), (1, 3, 5), (2, 3, 1), (3, 4, 1), (2, 4, 7)],
+            directed=True,
+            weighted=True,
+        )
+
+    def test_dijkstra(self):
+        """Test dijkstra counts pushes, stale pops and relaxations"""
+        stats = TraversalStats()
+        distance = dijkstra(self.G, self.v[1], stats=stats)
+        self.assertEqual(distance, dijkstra(self.G, self.v[1]))
+        self.assertEqual(stats.vertices_settled, 4)
+        self.assertEqual(stats.edges_scanned, 5)
+        # 3 and 4 are reached first by longer paths
+        self.assertEqual(stats.edges_relaxed, 5)
+        self.assertEqual(stats.heap_pushes, 6)
+        self.assertEqual(stats.stale_pops, 2)
+        self.assertGreaterEqual(stats.peak_frontier, 2)
+        self.assertEqual(set(stats.phases), {"init", "search", "result"})
+
+        stats = TraversalStats()
+        dijkstra(self.G, self.v[1], queue=IndexedHeap(4), stats=stats)
+        self.assertEqual((stats.vertices_settled, stats.stale_pops), (4, 0))
+        self.assertEqual(stats.heap_pushes, stats.edges_relaxed + 1)
+
+    def test_traversals(self):
+        """Test bfs_queue, dfs_stack and topological_sorting fill in the stats"""
+        for run, peak in (
+            (lambda stats: bfs.bfs_queue(self.G, self.v[1], stats=stats), 2),
+            (lambda stats: dfs.dfs_stack(self.G, self.v[1], stats=stats), 2),
+            (lambda stats: topological_sorting(self.G, stats=stats), 1),
+        ):
+            stats = TraversalStats()
+            run(stats)
+            self.assertEqual((stats.vertices_settled, stats.edges_scanned), (4, 5))
+            self.assertEqual(stats.peak_frontier, peak)
+            self.assertTrue(all(t >= 0 for t in stats.phases.values()))
+        self.assertEqual(stats.as_dict()["phases"].keys(), {"init", "sort"})
+
+    def test_bypasses_cache(self):
+        """Test a query given stats runs even if its result is cached"""
+        cache = self.G.enable_cache()
+        dijkstra(self.G, self.v[1])
+        stats = TraversalStats()
+        dijkstra(self.G, self.v[1], stats=stats)
+        self.assertEqual(stats.vertices_settled, 4)
+        self.assertEqual(cache.cache_info().hits, 0)
+        # passed positionally stats would go through the cache unfilled
+        self.assertRaises(TypeError, dijkstra, self.G, self.v[1], False, None, stats)
+        self.assertRaises(TypeError, bfs.bfs_queue, self.G, self.v[1], False, stats)
+
+
+class TestGraphServer(unittest.IsolatedAsyncioTestCase):
+    """Test the query server through the local client"""
+
+    async def asyncSetUp(self):
+        self.G = generators.grid(20, 20, seed=4)
+        self.server = await GraphServer(self.G, workers=0, max_pending=4).start()
+        self.client = await GraphClient.connect(*self.server.address())
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.close()
+
+    async def test_queries(self):
+        """Test answers match dijkstra and bfs in this process"""
+        distance = dijkstra(self.G, self.G.vertex(0), indexed=True)
+        answer = await self.client.dijkstra(0)
+        self.assertEqual([answer[i] for i in range(400)], distance)
+        self.assertEqual(await self.client.dijkstra(0, targets=[399, 7, "x"]),
+                         [distance[399], distance[7], None])
+        self.assertEqual(await self.client.bfs(0, targets=[0, 21, 399]), [0, 2, 38])
+        self.assertEqual(await self.client.request("ping"), "pong")
+        info = await self.client.request("info")
+        self.assertEqual((info["vertices"], info["edges"]), (400, 760))
+        with self.assertRaises(ValueError):
+            await self.client.dijkstra(1000)
+        with self.assertRaises(ValueError):
+            await self.client.request("flood")
+
+    async def test_coalescing_and_backpressure(self):
+        """Test concurrent queries share searches and at most max_pending are in flight"""
+        sources = [0, 1] * 10
+        answers = await asyncio.gather(*(self.client.dijkstra(s, [399]) for s in sources))
+        self.assertEqual(answers[:2], [[dijkstra(self.G, self.G.vertex(s))[self.G.vertex(399)]]
+                                       for s in (0, 1)])
+        self.assertEqual(answers, answers[:2] * 10)
+        stats = self.server.stats()
+        self.assertEqual(stats["requests"], 20)
+        self.assertEqual(stats["computations"] + stats["coalesced"], 20)
+        self.assertGreater(stats["coalesced"], 0)
+        self.assertLessEqual(stats["peak_pending"], 4)
+        self.assertEqual(stats["pending"], 0)
+
+    async def test_idle_connections_hold_no_slot(self):
+        """Test more idle connections than max_pending do not block other clients"""
+        idle = [await GraphClient.connect(*self.server.address()) for _ in range(6)]
+        try:
+            self.assertEqual(await asyncio.wait_for(self.client.request("ping"), 10), "pong")
+            self.assertEqual(await asyncio.wait_for(idle[-1].request("ping"), 10), "pong")
+        finally:
+            for client in idle:
+                await client.close()
+
+    async def test_request_after_server_closed(self):
+        """Test requests raise ConnectionError once the server closed the connection"""
+        await self.server.close()
+        await asyncio.wait_for(asyncio.shield(self.client._receiver), 10)
+        with self.assertRaises(ConnectionError):
+            await asyncio.wait_for(self.client.request("ping"), 10)
+
+    @unittest.skipUnless(hasattr(socket, "AF_UNIX"), "needs Unix sockets")
+    async def test_unix_socket_with_workers(self):
+        """Test worker processes behind a Unix socket"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "graph.sock")
+            async with await GraphServer(self.G, workers=1).start_unix(path) as server:
+                async with await GraphClient.connect_unix(path) as client:
+                    self.assertEqual(await client.bfs(399, targets=[0]), [38])
+                    self.assertEqual(server.stats()["computations"], 1)
+
+    async def test_broken_pool_answers_errors(self):
+        """Test requests get an error response once a worker process died"""
+        async with await GraphServer(self.G, workers=1).start() as server:
+            async with await GraphClient.connect(*server.address()) as client:
+                await client.bfs(0, targets=[1])
+                for process in list(server._executor._processes.values()):
+                    process.kill()
+                    process.join()
+                with self.assertRaises(ValueError):
+                    await asyncio.wait_for(client.bfs(1, targets=[0]), 10)
+                self.assertEqual(await client.request("ping"), "pong")
+
+
+class TestPartition(unittest.TestCase):
+    """Test partitioners and their shards"""
+
+    def setUp(self):
+        self.G = generators.grid(12, 12, seed=5)
+
+    def test_shards_cover_graph(self):
+        """Test every vertex and edge lands in exactly one shard"""
+        for partition in (hash_partition, bfs_partition, label_propagation_partition):
+            P = partition(self.G, 3)
+            self.assertEqual(P.k(), 3)
+            self.assertEqual(sum(P.sizes()), 144)
+            self.assertEqual(sorted(v for shard in P.shards() for v in shard.vertices),
+                             list(range(144)))
+            # every undirected edge is stored in both rows
+            self.assertEqual(sum(len(shard.targets) for shard in P.shards()), 2 * 264)
+            for shard in P.shards():
+                for v in shard.vertices:
+                    self.assertEqual(P.owner(self.G.vertex(v)), shard.number)
+
+    def test_boundary_tables(self):
+        """Test boundary vertices and ghosts match the cut edges"""
+        P = bfs_partition(self.G, 4)
+        for shard in P.shards():
+            for v in shard.boundary:
+                self.assertTrue(any(P.owner(u) != shard.number
+                                    for u in self.G._outgoing[self.G.vertex(v)]))
+            for owner, ghosts in shard.ghosts.items():
+                self.assertNotEqual(owner, shard.number)
+                self.assertTrue(all(P.owner(self.G.vertex(g)) == owner for g in ghosts))
+
+    def test_edge_cut(self):
+        """Test grown partitions cut fewer edges than hashing"""
+        hashed = hash_partition(self.G, 4).edge_cut()
+        grown = bfs_partition(self.G, 4).edge_cut()
+        self.assertLess(grown, hashed)
+        refined = label_propagation_partition(self.G, 4)
+        self.assertLessEqual(refined.edge_cut(), grown)
+        self.assertLessEqual(max(refined.sizes()), 38)
+
+
+class TestShardedGraph(unittest.TestCase):
+    """Test bfs and dijkstra across shard worker processes"""
+
+    def test_matches_single_process(self):
+        """Test sharded searches agree with dijkstra and bfs_queue"""
+        G = generators.erdos_renyi(200, 600, directed=True, seed=6)
+        s = G.vertex(0)
+        parent = bfs.bfs_queue(G, s)
+        levels = {s: 0}
+        for v in parent:
+            path = []
+            while parent[v] is not None:
+                path.append(v)
+                v = parent[v].opposite(v)
+            levels[path[0] if path else s] = len(path)
+        with ShardedGraph(label_propagation_partition(G, 3)) as S:
+            self.assertEqual(S.dijkstra(s), dijkstra(G, s))
+            self.assertGreater(S.rounds(), 1)
+            reached = {v: d for v, d in S.bfs(s).items() if d != float("inf")}
+            self.assertEqual(reached, levels)
+
+
+class TestPriorityQueues(unittest.TestCase):
+    """Test the priority queues accepted by dijkstra"""
+
+    def test_indexed_heap_decrease_key(self):
+        """Test decreasing a key moves the item without duplicating it"""
+        for d in (2, 3):
+            queue = IndexedHeap(5, d)
+            for item, key in enumerate([5, 3, 8, 1, 9]):
+                queue.push(item, key)
+            queue.push(2, 0)
+            queue.push(3, 7)
+            self.assertEqual(len(queue), 5)
+            self.assertEqual([queue.pop() for _ in range(5)],
+                             [(0, 2), (1, 3), (3, 1), (5, 0), (9, 4)])
+            self.assertTrue(queue.is_empty())
+
+    def test_bucket_queue(self):
+        """Test bucket queue pops in key order and skips stale entries"""
+        queue = BucketQueue(4, 3)
+        queue.push(0, 0)
+        queue.push(1, 3)
+        queue.push(2, 2)
+        queue.push(1, 1)
+        self.assertEqual(len(queue), 3)
+        self.assertEqual([queue.pop() for _ in range(3)], [(0, 0), (1, 1), (2, 2)])
+        self.assertRaises(ValueError, queue.push, 3, 6)
+        self.assertRaises(IndexError, queue.pop)
+
+
+class TestCompactGraph(unittest.TestCase):
+    """Test CSR snapshots and the traversals running on them"""
+
+    def setUp(self):
+        """Create a weighted directed graph"""
+        self.G = Graph(True)
+        self.vA = self.G.insert_vertex("A")
+        self.vB = self.G.insert_vertex("B")
+        self.vC = self.G.insert_vertex("C")
+        self.vD = self.G.insert_vertex("D")
+        self.vE = self.G.insert_vertex("E")
+
+        self.G.insert_edge(self.vA, self.vB, 4)
+        self.G.insert_edge(self.vA, self.vC, 1)
+        self.G.insert_edge(self.vC, self.vB, 2)
+        self.G.insert_edge(self.vB, self.vD, 5)
+        self.G.insert_edge(self.vC, self.vD, 8)
+
+    def test_freeze_counts(self):
+        """Test snapshot keeps vertex and edge counts"""
+        C = self.G.freeze()
+        self.assertTrue(C.is_directed())
+        self.assertEqual(C.vertex_count(), 5)
+        self.assertEqual(C.edge_count(), 5)
+        self.assertEqual(C.degree(C.index(self.vB), False), 2)
+        self.assertEqual(C.degree(C.index(self.vE)), 0)
+
+    def test_incoming_csr(self):
+        """Test incoming slots map back to the original edges"""
+        C = self.G.freeze()
+        offsets, targets = C.csr(False)
+        d = C.index(self.vD)
+        edges = {C.edge(pos, False) for pos in range(offsets[d], offsets[d + 1])}
+        self.assertEqual(
+            edges, {self.G.get_edge(self.vB, self.vD), self.G.get_edge(self.vC, self.vD)}
+        )
+
+    def test_traversals_match(self):
+        """Test compact traversals give the same results as the originals"""
+        C = self.G.freeze()
+        self.assertEqual(bfs.bfs_queue_compact(C, self.vA), bfs.bfs_queue(self.G, self.vA))
+        self.assertEqual(dfs.dfs_stack_compact(C, self.vA), dfs.dfs_stack(self.G, self.vA))
+        self.assertEqual(
+            dfs.dfs_stack_compact(C, self.vD, False), dfs.dfs_stack(self.G, self.vD, False)
+        )
+        self.assertEqual(dijkstra_compact(C, self.vA), dijkstra(self.G, self.vA))
+        self.assertEqual(topological_sorting_compact(C), topological_sorting(self.G))
+
+    def test_save_load(self):
+        """Test traversals run over a memory mapped snapshot"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "graph.csr")
+            self.G.freeze().save(path)
+            C = CompactGraph.load(path)
+
+            self.assertIsInstance(C.csr()[1], memoryview)
+            self.assertEqual(C.vertex_count(), 5)
+            self.assertEqual(C.edge_count(), 5)
+            # the label table is parsed on first access to the vertices
+            self.assertIsNone(C._vertices)
+            self.assertEqual(C.vertex(2).element(), "C")
+            self.assertEqual(C.index(C.vertex(2)), 2)
+            by_label = {v.element(): v for v in C.vertices()}
+            distance = dijkstra_compact(C, by_label["A"])
+            self.assertEqual({v.element(): d for v, d in distance.items()},
+                             {v.element(): d for v, d in dijkstra(self.G, self.vA).items()})
+            discovered = bfs.bfs_queue_compact(C, by_label["A"])
+            self.assertEqual(discovered[by_label["D"]].endpoints(),
+                             (by_label["B"], by_label["D"]))
+            discovered = dfs.dfs_stack_compact(C, by_label["D"], False)
+            self.assertEqual(len(discovered), 4)
+            self.assertEqual([v.element() for v in topological_sorting_compact(C)],
+                             [v.element() for v in topological_sorting(self.G)])
+
+            # a mapped snapshot can be written again
+            copy = os.path.join(tmp, "copy.csr")
+            C.save(copy)
+            self.assertEqual(CompactGraph.load(copy).weights().tolist(), C.weights().tolist())
+
+    def test_load_rejects_other_files(self):
+        """Test loading a file with a wrong header"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "graph.csr")
+            with open(path, "wb") as f:
+                f.write(b"\0" * 64)
+            self.assertRaises(ValueError, CompactGraph.load, path)
+
+    def test_undirected_snapshot(self):
+        """Test undirected snapshot stores every edge in both rows"""
+        G = Graph()
+        v1 = G.insert_vertex(1)
+        v2 = G.insert_vertex(2)
+        G.insert_edge(v1, v2, 3)
+        C = G.freeze()
+        self.assertFalse(C.is_directed())
+        self.assertEqual(C.edge_count(), 1)
+        self.assertEqual(list(C.neighbors(C.index(v2))), [C.index(v1)])
+        self.assertEqual(dijkstra_compact(C, v2)[v1], 3)
+
+    def test_from_arrays(self):
+        """Test building a snapshot from edge arrays"""
+        C = CompactGraph.from_arrays(3, [0, 1, 2], [1, 2, 2], [4, 5, 6], directed=False)
+        self.assertEqual(C.edge_count(), 3)
+        self.assertEqual(C.vertex_count(), 3)
+        self.assertEqual(C.index(C.vertex(1)), 1)
+        self.assertEqual(sorted(C.neighbors(1)), [0, 2])
+        self.assertEqual(sorted(C.neighbors(2)), [1, 2])
+        offsets, targets = C.csr()
+        pos = list(targets[offsets[1] : offsets[2]]).index(0) + offsets[1]
+        self.assertEqual(C.edge(pos).element(), 4)
+
+        C = CompactGraph.from_arrays(3, [2, 0], [0, 1])
+        self.assertEqual(list(C.neighbors(0, False)), [2])
+        self.assertIsNone(C.weights())
+
+    def test_non_numeric_weights(self):
+        """Test dijkstra refuses snapshots without numeric weights"""
+        G = Graph()
+        v1 = G.insert_vertex(1)
+        v2 = G.insert_vertex(2)
+        G.insert_edge(v1, v2, "x")
+        C = G.freeze()
+        self.assertIsNone(C.weights())
+        self.assertRaises(ValueError, dijkstra_compact, C, v1)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,24 +1,272 @@
 from collections import deque
+import threading
 from graph import Graph
+from compact_graph import CompactGraph
+from instrumentation import TraversalStats
 
 
-def topological_sorting(G: Graph):
+def topological_sorting(G: Graph, *, stats: TraversalStats = None):
+    """Returns the vertices of G in topological order with Kahn's algorithm
+
+    Vertices on a cycle, and those after them, are left out
+    A TraversalStats given as stats gets the counters and the init and sort
+    phase timings
+    """
+    if stats is not None:
+        stats.start()
     sorted: list[Graph.Vertex] = []
     next: deque[Graph.Vertex] = deque()
-    incount: dict[Graph.Vertex, int] = {}
+    # in counts are kept in a list indexed by Vertex.index()
+    incount: list[int] = [0] * G.vertex_count()
 
     for v in G.vertices():
         count = G.degree(v, False)
-        incount[v] = count
+        incount[v._index] = count
         if count == 0:
             next.append(v)
+    if stats is not None:
+        stats.lap("init")
 
     while next:
+        if stats is not None:
+            stats.frontier(len(next))
         v = next.popleft()
         sorted.append(v)
-        for e in G.incident_edges(v):
-            u = e.opposite(v)
-            incount[u] -= 1
-            if incount[u] == 0:
+        if stats is not None:
+            stats.vertices_settled += 1
+            stats.edges_scanned += len(G._outgoing[v])
+        for u in G._outgoing[v]:
+            incount[u._index] -= 1
+            if incount[u._index] == 0:
                 next.append(u)
+    if stats is not None:
+        stats.lap("sort")
     return sorted
+
+
+def topological_sorting_compact(C: CompactGraph):
+    """Same as topological_sorting, but runs over the integer arrays of a CompactGraph"""
+    offsets, targets = C.csr()
+    in_offsets, _ = C.csr(False)
+    n = C.vertex_count()
+    incount = [in_offsets[i + 1] - in_offsets[i] for i in range(n)]
+    sorted = [i for i in range(n) if incount[i] == 0]
+
+    for v in sorted:
+        for pos in range(offsets[v], offsets[v + 1]):
+            u = targets[pos]
+            incount[u] -= 1
+            if incount[u] == 0:
+                sorted.append(u)
+    return [C.vertex(i) for i in sorted]
+
+
+def topological_levels(G: Graph):
+    """Yields the vertices level by level, a level holds the vertices whose in
+    count drops to zero in the same round, so they do not depend on each other
+
+    Vertices on a cycle, and those after them, are never yielded
+    """
+    incount: list[int] = [0] * G.vertex_count()
+    level: list[Graph.Vertex] = []
+
+    for v in G.vertices():
+        count = G.degree(v, False)
+        incount[v._index] = count
+        if count == 0:
+            level.append(v)
+
+    while level:
+        yield level
+        next_level = []
+        for v in level:
+            for u in G._outgoing[v]:
+                incount[u._index] -= 1
+                if incount[u._index] == 0:
+                    next_level.append(u)
+        level = next_level
+
+
+class TaskScheduler:
+    """Hands out the vertices of a directed acyclic graph as tasks, a vertex is
+    ready once the vertices of all its incoming edges are done
+
+    start() returns the first ready vertices and done(v) the ones made ready
+    by finishing v, so a pool can be kept busy. With critical_path=True they
+    come sorted by priority(v), the longest path from v to a sink using the
+    edge elements as durations, so long chains start first; a None element
+    counts as 1. The graph must not change while scheduling. done is safe to
+    call from several threads. Raises ValueError if G has a cycle
+    """
+
+    # states of a task in _state
+    _WAITING = 0
+    _HANDED_OUT = 1
+    _DONE = 2
+
+    def __init__(self, G: Graph, critical_path=False):
+        order = topological_sorting(G)
+        if len(order) != G.vertex_count():
+            raise ValueError("the graph has a cycle")
+        self._graph = G
+        self._incount: list[int] = [G.degree(v, False) for v in G._vertex_list]
+        self._state = bytearray(G.vertex_count())
+        self._remaining = G.vertex_count()
+        self._lock = threading.Lock()
+        self._priority: list[int] = None
+        if critical_path:
+            self._priority = [0] * G.vertex_count()
+            for v in reversed(order):
+                longest = 0
+                for u, e in G._outgoing[v].items():
+                    x = e.element()
+                    length = (1 if x is None else x) + self._priority[u._index]
+                    if length > longest:
+                        longest = length
+                self._priority[v._index] = longest
+
+    def _sorted(self, vertices: list[Graph.Vertex]):
+        if self._priority is not None:
+            vertices.sort(key=lambda v: self._priority[v._index], reverse=True)
+        return vertices
+
+    def priority(self, v: Graph.Vertex):
+        """Returns the length of the longest path from v to a sink"""
+        return self._priority[v._index]
+
+    def start(self):
+        """Returns the vertices without incoming edges not handed out yet, so a
+        later call returns none of them again
+        """
+        ready = []
+        with self._lock:
+            for v in self._graph._vertex_list:
+                if self._incount[v._index] == 0 and self._state[v._index] == self._WAITING:
+                    self._state[v._index] = self._HANDED_OUT
+                    ready.append(v)
+        return self._sorted(ready)
+
+    def done(self, v: Graph.Vertex):
+        """Marks v as done and returns the vertices that became ready
+
+        Raises ValueError if v was not handed out by start or done, or is
+        already done
+        """
+        ready = []
+        with self._lock:
+            state = self._state[v._index]
+            if state == self._DONE:
+                raise ValueError(f"{v} is already done")
+            if state != self._HANDED_OUT:
+                raise ValueError(f"{v} was not handed out")
+            self._state[v._index] = self._DONE
+            self._remaining -= 1
+            for u in self._graph._outgoing[v]:
+                self._incount[u._index] -= 1
+                if self._incount[u._index] == 0:
+                    self._state[u._index] = self._HANDED_OUT
+                    ready.append(u)
+        return self._sorted(ready)
+
+    def remaining(self):
+        """Returns the number of vertices not done yet"""
+        return self._remaining
+
+    def is_finished(self):
+        """Returns True once every vertex is done"""
+        return self._remaining == 0
+
+
+class TopologicalOrder:
+    """Topological order of a directed acyclic graph maintained under edge insertions
+
+    Do not use constructor, use instead Graph.track_topological_order().
+    Follows Pearce and Kelly: an edge u -> v that agrees with the order
+    costs O(1), otherwise only the vertices placed between v and u that
+    are reachable from v, or reach u, are searched and reordered among
+    their own positions. insert_edge rejects an edge closing a cycle with
+    ValueError before changing the graph. Vertex removals and bulk loads
+    make the next use recompute the order with Kahn's algorithm
+    """
+
+    def __init__(self, G: Graph):
+        self._graph = G
+        self._rebuild()
+
+    def _rebuild(self):
+        order = topological_sorting(self._graph)
+        if len(order) != self._graph.vertex_count():
+            raise ValueError("the graph has a cycle")
+        self._order: list[Graph.Vertex] = order
+        # position in the order by Vertex.index()
+        self._position = [0] * len(order)
+        for p, v in enumerate(order):
+            self._position[v._index] = p
+        self._stale = False
+
+    def _vertex_inserted(self, v: Graph.Vertex):
+        if not self._stale:
+            self._position.append(len(self._order))
+            self._order.append(v)
+
+    def _edge_inserting(self, u: Graph.Vertex, v: Graph.Vertex):
+        """Reorders the vertices for the edge (u, v), raises ValueError on a cycle"""
+        if self._stale:
+            self._rebuild()
+        if u is v:
+            raise ValueError("the edge would create a cycle")
+        position = self._position
+        lower = position[v._index]
+        upper = position[u._index]
+        if lower > upper:
+            return
+
+        G = self._graph
+        forward = [v]
+        seen = {v._index}
+        stack = [v]
+        while stack:
+            w = stack.pop()
+            for x in G._outgoing[w]:
+                p = position[x._index]
+                if p == upper:
+                    raise ValueError("the edge would create a cycle")
+                if p < upper and x._index not in seen:
+                    seen.add(x._index)
+                    forward.append(x)
+                    stack.append(x)
+
+        backward = [u]
+        seen = {u._index}
+        stack = [u]
+        while stack:
+            w = stack.pop()
+            for x in G._incoming[w]:
+                if position[x._index] > lower and x._index not in seen:
+                    seen.add(x._index)
+                    backward.append(x)
+                    stack.append(x)
+
+        # the vertices reaching u go first, keeping their relative order
+        backward.sort(key=lambda w: position[w._index])
+        forward.sort(key=lambda w: position[w._index])
+        affected = backward + forward
+        slots = sorted(position[w._index] for w in affected)
+        for w, p in zip(affected, slots):
+            position[w._index] = p
+            self._order[p] = w
+
+    def _invalidate(self):
+        self._stale = True
+
+    def order(self):
+        """Returns the vertices in topological order"""
+        if self._stale:
+            self._rebuild()
+        return list(self._order)
+
+    def position(self, v: Graph.Vertex):
+        """Returns the position of v in the topological order"""
+        if self._stale:
+            self._rebuild()
+        return self._position[v._index]
@@ -0,0 +1,68 @@
+from graph import Graph
+from dfs import strongly_connected_components
+
+
+class TransitiveClosure:
+    """Reachability between all pairs of vertices of a graph
+
+    Vertices in the same strongly connected component reach the same
+    vertices, so one bit row is stored per component, as a Python int with
+    bit d set if component d is reachable. Rows are built over the
+    condensation in reverse topological order, OR-ing the rows of the
+    successors. Build time is O(V + E) plus O(E * C / 64) word operations
+    for C components, memory is O(C^2) bits. The closure is a snapshot,
+    later changes to the graph are not reflected
+    """
+
+    def __init__(self, G: Graph):
+        self._graph = G
+        comp, count = strongly_connected_components(G)
+        self._comp = comp
+        self._members: list[list[Graph.Vertex]] = [[] for _ in range(count)]
+        for v in G._vertex_list:
+            self._members[comp[v._index]].append(v)
+
+        # successors have smaller numbers, so their rows are already complete
+        rows = [1 << c for c in range(count)]
+        for c in range(count):
+            row = rows[c]
+            for v in self._members[c]:
+                for u in G._outgoing[v]:
+                    d = comp[u._index]
+                    if d != c:
+                        row |= rows[d]
+            rows[c] = row
+        self._rows = rows
+
+    def reachable(self, u: Graph.Vertex, v: Graph.Vertex):
+        """Returns True if there is a path from u to v, a vertex reaches itself
+
+        Not O(1): shifting the bit row of u costs O(C / 64) word operations
+        for C components, use descendants(u) to test many targets at once
+        """
+        return (self._rows[self._comp[u._index]] >> self._comp[v._index]) & 1 == 1
+
+    def descendants(self, u: Graph.Vertex):
+        """Returns an iteration of all the vertices reachable from u, u included"""
+        row = self._rows[self._comp[u._index]]
+        while row:
+            low = row & -row
+            yield from self._members[low.bit_length() - 1]
+            row ^= low
+
+    def to_graph(self):
+        """Returns a new graph with the edges of the graph and an edge (u, v)
+        for every other pair of distinct vertices where v is reachable from u
+        """
+        G = self._graph
+        closure = Graph(G.is_directed())
+        copies = {v: closure.insert_vertex(v.element()) for v in G._vertex_list}
+        for e in G.edges():
+            u, v = e.endpoints()
+            closure.insert_edge(copies[u], copies[v], e.element())
+        for u in G._vertex_list:
+            cu = copies[u]
+            for v in self.descendants(u):
+                if v is not u and closure.get_edge(cu, copies[v]) is None:
+                    closure.insert_edge(cu, copies[v])
+        return closure
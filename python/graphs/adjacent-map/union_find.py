@@ -0,0 +1,99 @@
+from array import array
+
+
+class UnionFind:
+    """Disjoint sets over the integers 0..n-1 with path halving and union by rank"""
+
+    __slots__ = ("_parent", "_rank", "_count")
+
+    def __init__(self, n=0):
+        self._parent = array("q", range(n))
+        # ranks stay below log2(n), a byte is enough
+        self._rank = bytearray(n)
+        self._count = n
+
+    def __len__(self):
+        """Returns the number of disjoint sets"""
+        return self._count
+
+    def add(self):
+        """Adds a new singleton set and returns its element"""
+        i = len(self._parent)
+        self._parent.append(i)
+        self._rank.append(0)
+        self._count += 1
+        return i
+
+    def find(self, i: int):
+        """Returns the representative of the set containing i"""
+        parent = self._parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        """Merges the sets containing i and j, returns False if they were the same"""
+        i = self.find(i)
+        j = self.find(j)
+        if i == j:
+            return False
+        rank = self._rank
+        if rank[i] < rank[j]:
+            i, j = j, i
+        self._parent[j] = i
+        if rank[i] == rank[j]:
+            rank[i] += 1
+        self._count -= 1
+        return True
+
+
+class ComponentTracker:
+    """Connected components of an undirected graph, kept up to date as edges are inserted
+
+    Do not use constructor, use instead Graph.track_components().
+    Insertions cost one union. Union-find can not split sets, so removals
+    and bulk loads only mark the tracker stale and the next query rebuilds
+    it in O(V + E)
+    """
+
+    def __init__(self, G):
+        self._graph = G
+        self._rebuild()
+
+    def _rebuild(self):
+        G = self._graph
+        self._sets = UnionFind(G.vertex_count())
+        for e in G.edges():
+            u, v = e.endpoints()
+            self._sets.union(u._index, v._index)
+        self._stale = False
+
+    def _vertex_inserted(self):
+        if not self._stale:
+            self._sets.add()
+
+    def _edge_inserted(self, u, v):
+        if not self._stale:
+            self._sets.union(u._index, v._index)
+
+    def _invalidate(self):
+        self._stale = True
+
+    def _current(self):
+        if self._stale:
+            self._rebuild()
+        return self._sets
+
+    def connected(self, u, v):
+        """Returns True if u and v are in the same connected component"""
+        sets = self._current()
+        return sets.find(u._index) == sets.find(v._index)
+
+    def component_of(self, v):
+        """Returns the representative vertex of the component of v"""
+        return self._graph.vertex(self._current().find(v._index))
+
+    def component_count(self):
+        """Returns the number of connected components"""
+        return len(self._current())